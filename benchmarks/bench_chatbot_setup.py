@@ -0,0 +1,62 @@
+# benchmarks/bench_chatbot_setup.py
+"""
+Mengukur overhead persiapan per request chatbot (tanpa memanggil API Gemini):
+sebelum = genai.configure + GenerativeModel baru dengan tool per perusahaan,
+sesudah = model dari registry per proses + binding tool lewat contextvar.
+
+    python -m benchmarks.bench_chatbot_setup --requests 500
+"""
+import argparse
+import os
+import time
+
+from benchmarks.utils import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GOOGLE_API_KEY', 'stub-key')  # backend stub: tidak ada request jaringan
+    setup_django()
+    import google.generativeai as genai
+    from accounts.models import Company
+    from dashboard.chatbot_service import (
+        MODEL_NAME, SAFETY_SETTINGS, TOOL_NAMES, _active_tools, model_registry,
+    )
+    from dashboard.chatbot_tools import CompanyAwareTools
+
+    companies = [Company(id=n, name=f'Perusahaan {n}') for n in range(1, 11)]
+    history = [{'role': 'user', 'parts': [{'text': 'Halo'}]}, {'role': 'model', 'parts': [{'text': 'Hai!'}]}]
+
+    def before(company):
+        genai.configure(api_key=os.environ['GOOGLE_API_KEY'])
+        tools = CompanyAwareTools(company=company)
+        model = genai.GenerativeModel(
+            model_name=MODEL_NAME,
+            tools=[getattr(tools, name) for name in TOOL_NAMES],
+            safety_settings=SAFETY_SETTINGS,
+        )
+        return model.start_chat(history=history, enable_automatic_function_calling=True)
+
+    def after(company):
+        token = _active_tools.set(CompanyAwareTools(company=company))
+        try:
+            return model_registry.get_model().start_chat(history=history, enable_automatic_function_calling=True)
+        finally:
+            _active_tools.reset(token)
+
+    model_registry.get_model()  # pemanasan: model dibuat sekali saat worker mulai
+    results = {}
+    for label, func in (('sebelum', before), ('sesudah', after)):
+        start = time.perf_counter()
+        for n in range(args.requests):
+            func(companies[n % len(companies)])
+        results[label] = (time.perf_counter() - start) / args.requests
+        print(f"{label:<8} {results[label] * 1e6:10.1f} µs per request")
+    print(f"Percepatan: {results['sebelum'] / results['sesudah']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_chatbot_stream.py
+"""
+Mengukur waktu sampai byte pertama (TTFB) dan waktu total chatbot_async_api
+dibandingkan chatbot_stream_api (SSE), memakai server Gemini palsu lokal.
+
+    python -m benchmarks.bench_chatbot_stream --latency 0.3 --generation-time 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from unittest.mock import patch
+
+import grpc
+
+from benchmarks.fake_llm_server import running_fake_llm_server
+from benchmarks.utils import create_company, setup_django, temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--generation-time', type=float, default=2.0)
+    parser.add_argument('--port', type=int, default=50552)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GOOGLE_API_KEY', 'stub-key')
+    setup_django()
+    from django.test import AsyncClient
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient
+    from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+        GenerativeServiceGrpcAsyncIOTransport,
+    )
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from dashboard import chatbot_service
+    from dashboard.chatbot_service import model_registry
+    from dashboard.llm_limiter import LLMLimiter
+    from dashboard.models import Product
+
+    setup_test_environment()
+    # Setiap request harus sampai ke Gemini: prompt cache, intent router dan limiter dimatikan
+    unlimited = LLMLimiter(rate_per_minute=10 ** 9, burst=10 ** 9, max_concurrent=10 ** 9)
+    with running_fake_llm_server(args.port, args.latency, args.generation_time) as address, temporary_database(), \
+            patch.object(chatbot_service, '_get_cached_response', return_value=None), \
+            patch.object(chatbot_service, '_answer_by_intent', return_value=None), \
+            patch.object(chatbot_service, 'llm_limiter', unlimited):
+        company = create_company('Stream Bench')
+        Product.objects.create(company=company, name='Kopi', price=15000)
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(company.owner).access_token}'}
+        body = {'prompt': 'Berapa jumlah produk saya?'}
+
+        async def measure(url_name):
+            client = AsyncClient()
+            start = time.perf_counter()
+            response = await client.post(reverse(url_name), body, content_type='application/json', headers=headers)
+            assert response.status_code == 200
+            if not response.streaming:
+                elapsed = time.perf_counter() - start
+                return elapsed, elapsed
+            first_byte = None
+            async for _ in response.streaming_content:
+                first_byte = first_byte or time.perf_counter() - start
+            return first_byte, time.perf_counter() - start
+
+        async def run():
+            model = model_registry.get_model()
+            model._async_client = GenerativeServiceAsyncClient(
+                transport=GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(address))
+            )
+            results = {}
+            for url_name in ('chatbot-async-api', 'chatbot-stream-api'):
+                results[url_name] = [await measure(url_name) for _ in range(args.requests)]
+            await model._async_client.transport.close()
+            return results
+
+        results = asyncio.run(run())
+        model_registry.reset()
+
+        print(f"LLM palsu: latensi {args.latency} detik per panggilan, jawaban teks {args.generation_time} detik")
+        for url_name, samples in results.items():
+            ttfb = statistics.median(sample[0] for sample in samples)
+            total = statistics.median(sample[1] for sample in samples)
+            print(f"{url_name:<22} TTFB {ttfb:6.3f} detik   total {total:6.3f} detik")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_list_serialization.py
+"""
+Membandingkan serialisasi daftar produk lewat ProductSerializer(many=True) + JSONRenderer
+dengan jalur baca cepat (.values() + ValuesRowSerializer + ORJSONRenderer).
+
+    python -m benchmarks.bench_list_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+from benchmarks.utils import create_company, setup_django, temporary_database
+
+
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from dashboard.fast_serializers import ValuesRowSerializer
+    from dashboard.models import Product
+    from dashboard.renderers import ORJSONRenderer
+    from dashboard.serializers import ProductSerializer
+
+    fields = ProductSerializer.Meta.fields
+    with temporary_database():
+        print(f"{'baris':>8} {'ModelSerializer':>16} {'jalur cepat':>12} {'percepatan':>11}")
+        for size in args.sizes:
+            company = create_company(f'Bench {size}')
+            Product.objects.bulk_create(
+                [Product(company=company, name=f'Produk {n}', price=1000 + n % 997) for n in range(size)],
+                batch_size=5000,
+            )
+            products = Product.objects.filter(company=company).order_by('id')
+
+            def model_serializer_path():
+                return JSONRenderer().render(ProductSerializer(products.all(), many=True).data)
+
+            def fast_path():
+                rows = products.values(*fields)
+                return ORJSONRenderer().render(ValuesRowSerializer(ProductSerializer, fields).serialize(rows))
+
+            assert JSONRenderer().render(ProductSerializer(products.all(), many=True).data).replace(b' ', b'') \
+                == fast_path().replace(b' ', b''), "Output kedua jalur berbeda"
+
+            slow = measure(model_serializer_path, args.repeat)
+            fast = measure(fast_path, args.repeat)
+            print(f"{size:>8} {slow:>15.3f}s {fast:>11.3f}s {slow / fast:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
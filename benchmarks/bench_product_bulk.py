@@ -0,0 +1,57 @@
+# benchmarks/bench_product_bulk.py
+"""
+Mengukur endpoint produk massal (POST /dashboard/bulk/): satu request berisi
+N operasi update, dibandingkan dengan PUT /dashboard/<id>/ per produk
+(diukur pada sampel lalu diekstrapolasi ke N).
+
+    python -m benchmarks.bench_product_bulk --products 10000
+"""
+import argparse
+import time
+
+from benchmarks.utils import create_company, setup_django, temporary_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--sample', type=int, default=200, help='Jumlah PUT per produk yang diukur')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from dashboard.models import Product
+
+    with temporary_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+        company = create_company('Bulk')
+        Product.objects.bulk_create(
+            [Product(company=company, name=f'Produk {n}', price=1000) for n in range(args.products)], batch_size=5000,
+        )
+        ids = list(Product.objects.filter(company=company).values_list('id', flat=True))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(company.owner).access_token}')
+
+        # Request pemanasan: import modul dan URL resolver tidak ikut terukur
+        client.post(reverse('product-bulk-api'), [], format='json')
+
+        operations = [{'op': 'update', 'id': pk, 'price': 2500} for pk in ids]
+        with timer(f"1 request bulk, {len(operations):,} update", len(operations)):
+            response = client.post(reverse('product-bulk-api'), operations, format='json')
+        assert response.status_code == 200 and response.json()['updated'] == len(operations), response.content[:200]
+
+        sample = ids[:args.sample]
+        start = time.perf_counter()
+        for n, pk in enumerate(sample):
+            response = client.put(reverse('product-detail-api', kwargs={'pk': pk}),
+                                  {'name': f'Produk {n}', 'price': 3000}, format='json')
+            assert response.status_code == 200, response.content[:200]
+        per_request = (time.perf_counter() - start) / len(sample)
+        print(f"{'PUT per produk (ekstrapolasi)':<40} {per_request * len(ids):8.3f} detik  "
+              f"({per_request * 1000:.1f} ms per request)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_product_import.py
+"""
+Membandingkan import produk lama (satu INSERT per baris) dengan pipeline
+streaming + bulk_create di dashboard/importers.py.
+
+    python -m benchmarks.bench_product_import --rows 50000
+"""
+import argparse
+import time
+
+from benchmarks.utils import create_company, setup_django, temporary_database, timer
+
+
+def build_csv(rows):
+    lines = ["Nama Produk,Harga"]
+    lines += [f"Produk {n},{1000 + n % 500}" for n in range(rows)]
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def legacy_import(content, company):
+    """Salinan logika handle_uploaded_excel sebelum pipeline streaming."""
+    import io
+    import pandas as pd
+    from dashboard.models import Product
+
+    df = pd.read_csv(io.BytesIO(content))
+    for index, row in df.iterrows():
+        Product.objects.create(company=company, name=row['Nama Produk'], price=row['Harga'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from dashboard.importers import import_products
+    from dashboard.models import Product
+
+    content = build_csv(args.rows)
+    with temporary_database():
+        results = {}
+
+        company = create_company('Legacy Import')
+        start = time.perf_counter()
+        with timer("Lama (create per baris)", args.rows):
+            legacy_import(content, company)
+        results['legacy'] = time.perf_counter() - start
+
+        company = create_company('Streaming Import')
+        start = time.perf_counter()
+        with timer("Baru (streaming + bulk_create)", args.rows):
+            import_products(SimpleUploadedFile('produk.csv', content), company, batch_size=args.batch_size)
+        results['bulk'] = time.perf_counter() - start
+
+        company_rows = Product.objects.filter(company=company).count()
+        with timer("Baru, upsert ulang file yang sama", args.rows):
+            import_products(SimpleUploadedFile('produk.csv', content), company, batch_size=args.batch_size)
+        assert Product.objects.filter(company=company).count() == company_rows
+
+        print(f"Percepatan: {results['legacy'] / results['bulk']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
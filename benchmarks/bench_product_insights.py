@@ -0,0 +1,62 @@
+# benchmarks/bench_product_insights.py
+"""
+Mengukur durasi batch `score_product_insights` untuk beberapa ukuran data,
+untuk memastikan waktu proses tumbuh linear terhadap jumlah baris penjualan
+(rollup harian) dan produk.
+
+    python -m benchmarks.bench_product_insights --companies 50 --products 40
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.utils import create_company, setup_django, temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--companies', type=int, default=50)
+    parser.add_argument('--products', type=int, default=40, help='Produk per perusahaan')
+    parser.add_argument('--days', type=int, default=30, help='Hari penjualan per produk terjual')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.utils import timezone
+    from dashboard.insights import score_product_insights
+    from dashboard.models import DailySalesRollup, Product
+
+    today = timezone.localdate()
+    with temporary_database():
+        rollup_rows = products_total = 0
+        for scale in (1, 2, 4):
+            # Tambah data sampai ukuran total = scale x ukuran dasar
+            while products_total < scale * args.companies * args.products:
+                company = create_company(f'Insight {products_total}')
+                products = Product.objects.bulk_create([
+                    Product(company=company, name=f'Produk {n}', price=1000 + n) for n in range(args.products)
+                ])
+                rows = [
+                    DailySalesRollup(company=company, product=product, day=today - timedelta(days=d),
+                                     quantity=random.randint(1, 20), revenue=random.randint(1, 20) * 1000)
+                    # Seperempat produk tidak pernah terjual (terdeteksi lewat anti-join)
+                    for product in products[: args.products * 3 // 4]
+                    for d in range(args.days)
+                ]
+                DailySalesRollup.objects.bulk_create(rows, batch_size=5000)
+                rollup_rows += len(rows)
+                products_total += len(products)
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            start = time.perf_counter()
+            scored = score_product_insights()
+            elapsed = time.perf_counter() - start
+            print(f"{rollup_rows:>9,} baris rollup  {scored:>7,} produk  {elapsed:7.3f} detik  "
+                  f"({rollup_rows / elapsed:,.0f} baris/detik)")
+
+
+if __name__ == '__main__':
+    main()
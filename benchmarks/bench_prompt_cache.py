@@ -0,0 +1,42 @@
+# benchmarks/bench_prompt_cache.py
+"""
+Mengukur latensi lookup prompt cache chatbot (hit, hit dengan partikel obrolan,
+miss) saat satu perusahaan sudah punya banyak entri.
+
+    python -m benchmarks.bench_prompt_cache --entries 2000
+"""
+import argparse
+import time
+
+from benchmarks.utils import create_company, setup_django, temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.prompt_cache import PromptCache
+
+    with temporary_database():
+        company = create_company()
+        prompt_cache = PromptCache(max_entries=args.entries)
+        for i in range(args.entries):
+            prompt_cache.set(company.id, f"pertanyaan nomor {i} tentang produk dan penjualan", f"jawaban {i}")
+
+        for label, prompt in (
+            ('hit', "Pertanyaan nomor 42 tentang produk dan penjualan?"),
+            ('hit + partikel', "pertanyaan nomor 42 tentang produk dan penjualan ya"),
+            ('miss', "apa kabar hari ini"),
+        ):
+            start = time.perf_counter()
+            for _ in range(args.lookups):
+                prompt_cache.get(company.id, prompt)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / args.lookups
+            print(f"{label:<15} {elapsed_ms:8.3f} ms per lookup ({args.entries} entri)")
+
+
+if __name__ == '__main__':
+    main()
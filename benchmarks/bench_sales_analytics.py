@@ -0,0 +1,113 @@
+# benchmarks/bench_sales_analytics.py
+"""
+Membandingkan analitik penjualan (rolling average, pola per hari, perkiraan,
+anomali z-score) untuk satu perusahaan dengan riwayat penjualan besar:
+
+- vectorized + rollup: `load_daily_sales` (satu query GROUP BY pada
+  DailySalesRollup) lalu `build_sales_report` dengan NumPy/pandas;
+- vectorized + Sale mentah: semua baris Sale dimuat ke pandas lalu di-resample;
+- loop Python: iterasi per baris Sale dan perhitungan per hari dengan loop biasa.
+
+    python -m benchmarks.bench_sales_analytics --sales 1000000 --days 365
+"""
+import argparse
+import math
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from benchmarks.utils import create_company, setup_django, temporary_database, timer
+
+
+def naive_report(sales, start, end, window=28, threshold=3.0):
+    """Perhitungan yang sama dengan build_sales_report, ditulis dengan loop per baris."""
+    per_day = defaultdict(float)
+    for sale_date, line_total in sales:
+        per_day[sale_date.date()] += float(line_total)
+
+    days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    values = [per_day.get(day, 0.0) for day in days]
+    rolling_7d = [sum(values[max(0, i - 6):i + 1]) / len(values[max(0, i - 6):i + 1]) for i in range(len(values))]
+
+    anomalies = []
+    for i, value in enumerate(values):
+        history = values[max(0, i - window):i]
+        if len(history) < 7:
+            continue
+        mean = sum(history) / len(history)
+        std = math.sqrt(sum((v - mean) ** 2 for v in history) / (len(history) - 1))
+        std = max(std, abs(mean) * 0.01)
+        if std and abs(value - mean) / std >= threshold:
+            anomalies.append(days[i])
+
+    weekday_totals = defaultdict(list)
+    for day, value in zip(days, values):
+        weekday_totals[day.weekday()].append(value)
+    overall = sum(values) / len(values)
+    seasonality = [sum(v) / len(v) / overall for _, v in sorted(weekday_totals.items())]
+    return {'rolling_7d': rolling_7d, 'anomalies': anomalies, 'seasonality': seasonality}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sales', type=int, default=1_000_000, help='Jumlah baris Sale')
+    parser.add_argument('--days', type=int, default=365, help='Panjang riwayat (hari)')
+    parser.add_argument('--products', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    import pandas as pd
+    from django.utils import timezone
+    from dashboard.analytics import build_sales_report, load_daily_sales
+    from dashboard.models import Product, Sale
+    from dashboard.rollups import rebuild_rollup
+
+    today = timezone.localdate()
+    start = today - timedelta(days=args.days - 1)
+    with temporary_database():
+        company = create_company('Analytics')
+        products = Product.objects.bulk_create([
+            Product(company=company, name=f'Produk {n}', price=1000 * (n + 1)) for n in range(args.products)
+        ])
+
+        per_day = args.sales // args.days
+        with timer(f"Membuat {per_day * args.days:,} Sale", per_day * args.days):
+            for offset in range(args.days):
+                sale_date = timezone.now() - timedelta(days=offset)
+                sales = [
+                    Sale(company=company, product=random.choice(products), quantity=random.randint(1, 5),
+                         sale_date=sale_date)
+                    for _ in range(per_day)
+                ]
+                for sale in sales:
+                    sale.snapshot_price()
+                Sale.objects.bulk_create(sales, batch_size=5000)
+        with timer("rebuild_rollup"):
+            rebuild_rollup(company=company)
+
+        with timer("vectorized + rollup (1 query)"):
+            report = build_sales_report(load_daily_sales(company, start=start))
+
+        with timer("vectorized + Sale mentah", args.sales):
+            rows = Sale.objects.filter(company=company).values_list('sale_date', 'line_total')
+            frame = pd.DataFrame.from_records(rows.iterator(chunk_size=20000), columns=['sale_date', 'revenue'])
+            frame['revenue'] = frame['revenue'].astype(float)
+            daily = frame.set_index(
+                frame['sale_date'].dt.tz_convert(timezone.get_current_timezone()).dt.tz_localize(None)
+            )['revenue'].resample('D').sum()
+            daily = daily.reindex(pd.date_range(start, today, freq='D'), fill_value=0.0)
+            build_sales_report(pd.DataFrame({'quantity': 0.0, 'revenue': daily}))
+
+        with timer("loop Python per baris", args.sales):
+            sales = Sale.objects.filter(company=company).values_list('sale_date', 'line_total')
+            naive = naive_report(
+                ((timezone.localtime(sale_date), line_total) for sale_date, line_total in sales.iterator(chunk_size=20000)),
+                start, today,
+            )
+
+        print(f"{report['history_days']} hari, {len(report['anomalies'])} anomali "
+              f"(loop Python: {len(naive['anomalies'])}), perkiraan 7 hari Rp {report['forecast_total']:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
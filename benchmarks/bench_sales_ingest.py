@@ -0,0 +1,51 @@
+# benchmarks/bench_sales_ingest.py
+"""
+Mengukur throughput `ingest_sales` (endpoint penjualan massal POS) untuk
+penjualan baru dan untuk pengiriman ulang batch yang sama (semua duplikat),
+dibandingkan dengan Sale.objects.create() per baris.
+
+    python -m benchmarks.bench_sales_ingest --sales 50000 --batch-size 1000
+"""
+import argparse
+import random
+
+from benchmarks.utils import create_company, setup_django, temporary_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sales', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.models import Product, Sale
+    from dashboard.sales_ingest import ingest_sales
+
+    with temporary_database():
+        company = create_company('Ingest')
+        products = Product.objects.bulk_create([
+            Product(company=company, name=f'Produk {n}', price=1000 * (n + 1)) for n in range(args.products)
+        ])
+        items = [
+            {'transaction_id': f'POS-{n}', 'product_id': random.choice(products).id, 'quantity': random.randint(1, 5)}
+            for n in range(args.sales)
+        ]
+
+        with timer("ingest_sales (baru)", args.sales):
+            report = ingest_sales(company, items, batch_size=args.batch_size)
+        assert report.created == args.sales, report.as_dict()
+
+        with timer("ingest_sales (kirim ulang, duplikat)", args.sales):
+            report = ingest_sales(company, items, batch_size=args.batch_size)
+        assert report.duplicates == args.sales, report.as_dict()
+
+        sample = min(args.sales, 5000)
+        with timer(f"Sale.objects.create x {sample:,}", sample):
+            for item in items[:sample]:
+                Sale.objects.create(company=company, product_id=item['product_id'], quantity=item['quantity'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/fake_llm_server.py
+"""
+Server Gemini palsu (gRPC) untuk load test lokal, tanpa API key dan tanpa internet.
+Setiap GenerateContent dijawab setelah jeda `--latency` detik. Pesan user pertama
+dijawab dengan function call `get_product_count`, lalu setelah menerima
+function response server mengembalikan jawaban teks. Jawaban teks butuh tambahan
+`--generation-time` detik; pada StreamGenerateContent waktu itu dibagi rata ke
+setiap kata yang dikirim sebagai potongan terpisah.
+
+    python -m benchmarks.fake_llm_server --port 50551 --latency 0.5
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+from contextlib import contextmanager
+
+import grpc
+from google.ai import generativelanguage_v1beta as glm
+
+SERVICE_NAME = 'google.ai.generativelanguage.v1beta.GenerativeService'
+
+
+def _reply(part):
+    return glm.GenerateContentResponse(candidates=[
+        glm.Candidate(content=glm.Content(role='model', parts=[part]), finish_reason=glm.Candidate.FinishReason.STOP)
+    ])
+
+
+class FakeGenerativeService:
+    def __init__(self, latency, generation_time=0.0):
+        self.latency = latency
+        self.generation_time = generation_time
+
+    def _answer(self, request):
+        """Mengembalikan teks jawaban, atau None jika model harus memanggil tool dulu."""
+        last_parts = request.contents[-1].parts
+        function_responses = [part.function_response for part in last_parts if 'function_response' in part]
+        if function_responses:
+            result = function_responses[0].response.get('result')
+            return f"Hasil dari {function_responses[0].name} untuk perusahaan Anda adalah {result} produk."
+        return None
+
+    async def generate_content(self, request, context):
+        await asyncio.sleep(self.latency)
+        answer = self._answer(request)
+        if answer is None:
+            return _reply(glm.Part(function_call=glm.FunctionCall(name='get_product_count', args={})))
+        await asyncio.sleep(self.generation_time)
+        return _reply(glm.Part(text=answer))
+
+    async def stream_generate_content(self, request, context):
+        await asyncio.sleep(self.latency)
+        answer = self._answer(request)
+        if answer is None:
+            yield _reply(glm.Part(function_call=glm.FunctionCall(name='get_product_count', args={})))
+            return
+        words = answer.split(' ')
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(self.generation_time / (len(words) - 1))
+            yield _reply(glm.Part(text=word if index == len(words) - 1 else word + ' '))
+
+
+async def start_server(port=0, latency=0.5, generation_time=0.0):
+    """Menjalankan server di event loop saat ini. Mengembalikan (server, port)."""
+    service = FakeGenerativeService(latency, generation_time)
+    handler = grpc.method_handlers_generic_handler(SERVICE_NAME, {
+        'GenerateContent': grpc.unary_unary_rpc_method_handler(
+            service.generate_content,
+            request_deserializer=glm.GenerateContentRequest.deserialize,
+            response_serializer=glm.GenerateContentResponse.serialize,
+        ),
+        'StreamGenerateContent': grpc.unary_stream_rpc_method_handler(
+            service.stream_generate_content,
+            request_deserializer=glm.GenerateContentRequest.deserialize,
+            response_serializer=glm.GenerateContentResponse.serialize,
+        ),
+    })
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port(f'127.0.0.1:{port}')
+    await server.start()
+    return server, port
+
+
+async def serve_forever(port, latency, generation_time):
+    server, port = await start_server(port, latency, generation_time)
+    print(f"Fake LLM server berjalan di 127.0.0.1:{port} (latensi {latency} detik)", flush=True)
+    await server.wait_for_termination()
+
+
+@contextmanager
+def running_fake_llm_server(port, latency, generation_time=0.0):
+    """Menjalankan server palsu di proses terpisah selama blok `with`. Menghasilkan alamatnya."""
+    server = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.fake_llm_server',
+        '--port', str(port), '--latency', str(latency), '--generation-time', str(generation_time),
+    ])
+    address = f'127.0.0.1:{port}'
+    try:
+        channel = grpc.insecure_channel(address)
+        grpc.channel_ready_future(channel).result(timeout=15)
+        channel.close()
+        yield address
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=50551)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--generation-time', type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(serve_forever(args.port, args.latency, args.generation_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/load_chatbot_async.py
+"""
+Load test chatbot terhadap server Gemini palsu lokal (benchmarks/fake_llm_server.py).
+
+Membandingkan:
+- chatbot_api (sync) dilayani oleh N worker sync, seperti gunicorn --workers N;
+- chatbot_async_api dilayani oleh SATU event loop ASGI.
+
+    python -m benchmarks.load_chatbot_async --requests 200 --sync-workers 4 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import grpc
+
+from benchmarks.fake_llm_server import running_fake_llm_server
+from benchmarks.utils import create_company, setup_django, temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--sync-workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--port', type=int, default=50551)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GOOGLE_API_KEY', 'stub-key')
+    setup_django()
+    from django.db import connection
+    from django.test import AsyncClient, Client
+    from django.test.utils import override_settings, setup_test_environment
+    from django.urls import reverse
+    from google.ai.generativelanguage_v1beta.services.generative_service import (
+        GenerativeServiceAsyncClient, GenerativeServiceClient,
+    )
+    from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+        GenerativeServiceGrpcAsyncIOTransport, GenerativeServiceGrpcTransport,
+    )
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from dashboard import chatbot_service
+    from dashboard.chatbot_service import model_registry
+    from dashboard.llm_limiter import LLMLimiter
+    from dashboard.models import ChatHistory, Product
+
+    setup_test_environment()
+    if connection.vendor == 'sqlite':
+        # Database SQLite in-memory terkunci saat ditulis dari banyak thread; pakai file
+        connection.settings_dict['TEST']['NAME'] = os.path.join(os.path.dirname(connection.settings_dict['NAME']) or '.', 'load_chatbot_test.sqlite3')
+    # Yang diukur adalah jalur panggilan Gemini: prompt cache, intent router dan limiter
+    # dimatikan, riwayat chat ditulis langsung agar bisa dihitung di akhir.
+    unlimited = LLMLimiter(rate_per_minute=10 ** 9, burst=10 ** 9, max_concurrent=10 ** 9)
+    with running_fake_llm_server(args.port, args.latency) as address, temporary_database(), \
+            override_settings(CHAT_HISTORY_WRITE_BEHIND=False), \
+            patch.object(chatbot_service, '_get_cached_response', return_value=None), \
+            patch.object(chatbot_service, '_answer_by_intent', return_value=None), \
+            patch.object(chatbot_service, 'llm_limiter', unlimited):
+        company = create_company('Load Test')
+        Product.objects.create(company=company, name='Kopi', price=15000)
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(company.owner).access_token}'}
+        # Prompt berbeda per request agar tidak digabung (coalescing) oleh limiter
+        body = lambda i: {'prompt': f'Berapa jumlah produk saya? #{i}'}
+
+        model = model_registry.get_model()
+        model._client = GenerativeServiceClient(
+            transport=GenerativeServiceGrpcTransport(channel=grpc.insecure_channel(address))
+        )
+
+        # --- Sync: setiap worker hanya bisa melayani satu request dalam satu waktu ---
+        def sync_request(i):
+            response = Client().post(reverse('chatbot-api'), body(i), content_type='application/json', headers=headers)
+            assert response.status_code == 200, response.content
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sync_workers) as pool:
+            list(pool.map(sync_request, range(args.requests)))
+        sync_elapsed = time.perf_counter() - start
+
+        # --- Async: satu event loop melayani semua request secara bersamaan ---
+        async def run_async():
+            model._async_client = GenerativeServiceAsyncClient(
+                transport=GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(address))
+            )
+            client = AsyncClient()
+
+            async def async_request(i):
+                response = await client.post(
+                    reverse('chatbot-async-api'), body(i), content_type='application/json', headers=headers,
+                )
+                assert response.status_code == 200, response.content
+
+            start = time.perf_counter()
+            await asyncio.gather(*(async_request(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - start
+            await model._async_client.transport.close()
+            return elapsed
+
+        async_elapsed = asyncio.run(run_async())
+        model._client.transport.close()
+        model_registry.reset()
+        assert ChatHistory.objects.filter(company=company).count() == args.requests * 2
+
+        print(f"Latensi LLM palsu per panggilan: {args.latency} detik (2 panggilan per chat karena function calling)")
+        print(f"sync  ({args.sync_workers} worker)      {sync_elapsed:7.2f} detik  "
+              f"{args.requests / sync_elapsed:7.1f} request/detik")
+        print(f"async (1 event loop)     {async_elapsed:7.2f} detik  "
+              f"{args.requests / async_elapsed:7.1f} request/detik")
+        print(f"Peningkatan throughput: {sync_elapsed / async_elapsed:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
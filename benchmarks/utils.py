@@ -0,0 +1,52 @@
+# benchmarks/utils.py
+"""
+Helper bersama untuk skrip benchmark. Jalankan benchmark dari root proyek, contoh:
+
+    python -m benchmarks.bench_product_import --rows 50000
+
+Setiap benchmark memakai database tes sementara (dibuat dan dihapus otomatis),
+sehingga data produksi tidak tersentuh.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mentoraconfig.settings')
+    django.setup()
+
+
+@contextmanager
+def temporary_database():
+    """Membuat database tes kosong (sudah dimigrasi) selama blok `with` berjalan."""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def create_company(name='Benchmark Company'):
+    from django.contrib.auth.models import User
+    from accounts.models import Company
+
+    owner = User.objects.create_user(username=f'bench_{name.lower().replace(" ", "_")}', password='benchmark')
+    return Company.objects.create(name=name, owner=owner)
+
+
+@contextmanager
+def timer(label, rows=None):
+    """Mencetak durasi blok kode, dan throughput jika jumlah baris diberikan."""
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    line = f"{label:<40} {elapsed:8.3f} detik"
+    if rows:
+        line += f"  ({rows / elapsed:,.0f} baris/detik)"
+    print(line)
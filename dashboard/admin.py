@@ -1,6 +1,6 @@
 # dashboard/admin.py
 from django.contrib import admin
-from .models import Product, ChatHistory
+from .models import Product, ChatHistory, ImportJob
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -29,3 +29,10 @@ class ChatHistoryAdmin(admin.ModelAdmin):
     prompt_snippet.short_description = 'Prompt'
     response_snippet.short_description = 'Response'
 
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'company', 'status', 'total_rows', 'error_count', 'created_at', 'finished_at')
+    list_filter = ('status', 'company')
+    exclude = ('payload',)
+    readonly_fields = ('company', 'file_name', 'total_rows', 'created_count', 'updated_count',
+                       'error_count', 'errors', 'message', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,23 @@
+# dashboard/analytics/__init__.py
+"""
+Analitik penjualan ter-vektorisasi (NumPy/pandas): riwayat harian satu
+perusahaan dimuat dengan satu query, lalu semua perhitungan (rolling average,
+pola musiman per hari, perkiraan, anomali z-score) dilakukan pada array utuh
+tanpa loop Python per baris.
+"""
+from .data import load_daily_sales, load_sales_history
+from .report import build_sales_report
+from .timeseries import (
+    WEEKDAY_NAMES, forecast_revenue, rolling_average, weekday_seasonality, zscore_anomalies,
+)
+
+__all__ = [
+    'WEEKDAY_NAMES',
+    'build_sales_report',
+    'forecast_revenue',
+    'load_daily_sales',
+    'load_sales_history',
+    'rolling_average',
+    'weekday_seasonality',
+    'zscore_anomalies',
+]
@@ -0,0 +1,39 @@
+# dashboard/analytics/report.py
+import numpy as np
+
+from .timeseries import WEEKDAY_NAMES, forecast_revenue, rolling_average, weekday_seasonality, zscore_anomalies
+
+
+def _records(frame):
+    """DataFrame -> list of dict siap JSON (tanggal ISO, NaN menjadi None)."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    frame.insert(0, 'day', frame.index.strftime('%Y-%m-%d'))
+    return frame.to_dict('records')
+
+
+def build_sales_report(daily, horizon=7, anomaly_window=28, threshold=3.0):
+    """
+    Laporan analitik dari DataFrame harian (load_daily_sales): rolling average 7
+    dan 28 hari, faktor musiman per hari, perkiraan `horizon` hari ke depan, dan
+    anomali z-score. Hasilnya dict biasa (bisa disimpan di cache dan dikirim
+    sebagai JSON).
+    """
+    revenue = daily['revenue']
+    analysed = daily.assign(
+        rolling_7d=rolling_average(revenue, 7),
+        rolling_28d=rolling_average(revenue, 28),
+    ).join(zscore_anomalies(revenue, window=anomaly_window, threshold=threshold))
+    analysed['z_score'] = analysed['z_score'].round(2)
+
+    seasonal = weekday_seasonality(revenue)
+    forecast = forecast_revenue(revenue, horizon=horizon)
+    anomalies = analysed[analysed['anomaly']]
+    return {
+        'history_days': len(daily),
+        'total_revenue': float(revenue.sum()),
+        'daily': _records(analysed),
+        'seasonality': dict(zip(WEEKDAY_NAMES, np.round(seasonal, 3).tolist())),
+        'forecast': _records(forecast.round(2).to_frame('revenue')),
+        'forecast_total': round(float(forecast.sum()), 2),
+        'anomalies': _records(anomalies[['revenue', 'z_score']]),
+    }
@@ -0,0 +1,68 @@
+# dashboard/analytics/timeseries.py
+"""
+Fungsi deret waktu untuk pd.Series harian (indeks tanggal berurutan tanpa
+celah, lihat data.load_daily_sales). Semua operasi memakai primitive
+NumPy/pandas pada array utuh.
+"""
+import numpy as np
+import pandas as pd
+
+WEEKDAY_NAMES = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+
+
+def rolling_average(values, window=7):
+    """Rata-rata bergerak `window` hari (hari-hari awal memakai data yang tersedia)."""
+    return values.rolling(window, min_periods=1).mean()
+
+
+def weekday_seasonality(values):
+    """
+    Faktor musiman per hari (indeks 0 = Senin): rata-rata hari tersebut dibagi
+    rata-rata keseluruhan. Semua 1.0 jika belum ada penjualan.
+    """
+    overall = values.mean()
+    if not overall or np.isnan(overall):
+        return np.ones(7)
+    by_weekday = values.groupby(values.index.dayofweek).mean().reindex(range(7))
+    return (by_weekday / overall).fillna(1.0).to_numpy()
+
+
+def forecast_revenue(values, horizon=7, window=28):
+    """
+    Perkiraan `horizon` hari ke depan: `window` hari terakhir dinormalkan dengan
+    faktor musiman per hari, diberi garis tren linear (np.polyfit), lalu
+    diproyeksikan dan dikalikan lagi dengan faktor musiman hari tujuan.
+    """
+    if values.empty:
+        return pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+    seasonal = weekday_seasonality(values)
+    recent = values.iloc[-window:]
+    factors = seasonal[recent.index.dayofweek]
+    adjusted = recent.to_numpy() / np.where(factors > 0, factors, 1.0)
+
+    steps = np.arange(len(adjusted))
+    if len(adjusted) >= 2:
+        slope, intercept = np.polyfit(steps, adjusted, 1)
+    else:
+        slope, intercept = 0.0, adjusted[0]
+
+    future = pd.date_range(values.index[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    future_steps = np.arange(len(adjusted), len(adjusted) + horizon)
+    predicted = (intercept + slope * future_steps) * seasonal[future.dayofweek]
+    return pd.Series(np.clip(predicted, 0, None), index=future)
+
+
+def zscore_anomalies(values, window=28, threshold=3.0, min_periods=7):
+    """
+    Z-score setiap hari terhadap rata-rata dan simpangan baku `window` hari
+    sebelumnya (hari itu sendiri tidak ikut dihitung). Hari dengan |z| >=
+    `threshold` ditandai anomali; z kosong (NaN) jika riwayat belum cukup.
+
+    Simpangan baku diberi batas bawah 1% dari rata-rata, supaya lonjakan setelah
+    penjualan yang konstan tetap terdeteksi (tanpa pembagian dengan nol).
+    """
+    history = values.shift(1).rolling(window, min_periods=min_periods)
+    mean = history.mean()
+    std = history.std().clip(lower=mean.abs() * 0.01).replace(0, np.nan)
+    z_score = (values - mean) / std
+    return pd.DataFrame({'z_score': z_score, 'anomaly': z_score.abs() >= threshold})
@@ -0,0 +1,87 @@
+# dashboard/cache.py
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+_MISSING = object()
+_bulk_invalidation = contextvars.ContextVar('bulk_invalidation', default=False)
+
+
+def _version_key(company_id):
+    return f"tenant:{company_id}:data-version"
+
+
+def get_data_version(company_id):
+    """
+    Versi data Product/Sale milik satu perusahaan. Semua key cache perusahaan
+    memuat versi ini, jadi menaikkan versi otomatis membuat cache lama tidak terpakai.
+    """
+    version = cache.get(_version_key(company_id))
+    if version is None:
+        # Pakai timestamp agar versi tidak pernah terulang walau key versi sempat hilang dari cache.
+        cache.add(_version_key(company_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(company_id))
+    return version
+
+
+def _set_new_version(company_id):
+    cache.set(_version_key(company_id), time.time_ns(), timeout=None)
+
+
+def bump_data_version(company_id):
+    """
+    Menandai data perusahaan telah berubah. Versi dinaikkan sekarang dan sekali lagi
+    setelah transaksi commit, supaya hasil yang dihitung dari data lama selama
+    transaksi berjalan juga tidak ikut terpakai.
+    """
+    _set_new_version(company_id)
+    transaction.on_commit(lambda: _set_new_version(company_id))
+
+
+@contextmanager
+def bulk_invalidation():
+    """
+    Untuk operasi massal: selama blok ini signal per instance tidak menaikkan versi
+    data (satu cache.set per baris). Pemanggil wajib memanggil bump_data_version
+    sekali sendiri untuk perusahaan yang datanya berubah.
+    """
+    token = _bulk_invalidation.set(True)
+    try:
+        yield
+    finally:
+        _bulk_invalidation.reset(token)
+
+
+def in_bulk_invalidation():
+    return _bulk_invalidation.get()
+
+
+def tenant_cache_key(company_id, name):
+    # Tanggal lokal ikut di key karena jendela analitik (7/30 hari) bergeser tiap hari.
+    return f"tenant:{company_id}:v{get_data_version(company_id)}:{timezone.localdate().isoformat()}:{name}"
+
+
+def tenant_cached(method):
+    """
+    Dekorator untuk metode CompanyAwareTools: hasilnya disimpan di cache per
+    perusahaan dan dipakai ulang sampai data perusahaan berubah atau TTL habis.
+    Tidak aktif jika TENANT_CACHE_ENABLED False.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not settings.TENANT_CACHE_ENABLED:
+            # Cache tidak dibagi antar worker: invalidasi tidak bisa dijamin (lihat settings)
+            return method(self, *args, **kwargs)
+        key = tenant_cache_key(self.company.id, method.__name__)
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = method(self, *args, **kwargs)
+            cache.set(key, result, timeout=settings.TENANT_CACHE_TTL)
+        return result
+    return wrapper
@@ -0,0 +1,333 @@
+# dashboard/chat_writer.py
+"""
+Penulisan ChatHistory secara write-behind: giliran chat dicatat ke file spool
+lokal (append + flush) lalu ditulis ke database per batch dengan bulk_create
+oleh thread latar belakang, sehingga request chatbot tidak menunggu INSERT.
+
+Setiap proses punya file spool sendiri yang dikunci (flock) selama proses hidup.
+File spool yang tidak terkunci berarti prosesnya sudah mati sebelum sempat
+flush; isinya ditulis ulang saat writer berikutnya mulai atau lewat
+`manage.py replay_chat_spool`. Penulisan ulang aman diulang karena setiap
+baris membawa `message_id` unik.
+"""
+import atexit
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import Company
+
+from .models import ChatHistory, ChatSession
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa flock, replay otomatis dimatikan
+    fcntl = None
+
+
+def _try_lock(file):
+    """Mengunci file secara eksklusif tanpa menunggu. True jika berhasil."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _drop_orphans(rows):
+    """
+    Memisahkan baris yang perusahaan atau sesinya sudah dihapus. ignore_conflicts
+    hanya melewati konflik unik (message_id), bukan pelanggaran foreign key, dan
+    satu baris seperti itu akan menggagalkan seluruh batch.
+    """
+    company_ids = {row['company_id'] for row in rows}
+    session_ids = {row['session_id'] for row in rows if row['session_id'] is not None}
+    existing_companies = set(Company.objects.filter(pk__in=company_ids).values_list('pk', flat=True))
+    existing_sessions = set()
+    if session_ids:
+        existing_sessions = set(ChatSession.objects.filter(pk__in=session_ids).values_list('pk', flat=True))
+    valid, dropped = [], []
+    for row in rows:
+        orphan = row['company_id'] not in existing_companies or (
+            row['session_id'] is not None and row['session_id'] not in existing_sessions
+        )
+        (dropped if orphan else valid).append(row)
+    return valid, dropped
+
+
+def write_rows(rows):
+    """
+    Menulis baris spool ke database; baris yang message_id-nya sudah ada dilewati,
+    dan baris milik perusahaan/sesi yang sudah dihapus dibuang (riwayatnya memang
+    ikut terhapus bersama sesinya). Mengembalikan jumlah baris yang dibuang.
+    """
+    if not rows:
+        return 0
+    rows, dropped = _drop_orphans(rows)
+    if dropped:
+        print(f"LOG: {len(dropped)} pesan chat dibuang karena sesi atau perusahaannya sudah dihapus")
+    if not rows:
+        return len(dropped)
+    chats = [
+        ChatHistory(
+            message_id=row['message_id'],
+            company_id=row['company_id'],
+            session_id=row['session_id'],
+            prompt=row['prompt'],
+            response=row['response'],
+            created_at=parse_datetime(row['created_at']),
+        )
+        for row in rows
+    ]
+    first_prompts = {}
+    for row in rows:
+        if row['session_id'] is not None:
+            first_prompts.setdefault(row['session_id'], row['prompt'])
+
+    with transaction.atomic():
+        ChatHistory.objects.bulk_create(chats, ignore_conflicts=True)
+        if first_prompts:
+            # Sesi ditandai aktif dan diberi judul dari prompt pertama (sama seperti penulisan langsung)
+            ChatSession.objects.filter(pk__in=first_prompts).update(updated_at=timezone.now())
+            for session_id, prompt in first_prompts.items():
+                ChatSession.objects.filter(pk=session_id, title='').update(title=prompt[:80])
+    return len(dropped)
+
+
+def read_spool(file):
+    rows = []
+    for line in file:
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Baris terakhir bisa terpotong jika proses mati saat menulis
+            continue
+    return rows
+
+
+def replay_orphaned_spools(spool_dir, batch_size=500):
+    """
+    Menulis ulang isi file spool milik proses yang sudah mati (file tidak terkunci)
+    ke database lalu menghapusnya. Mengembalikan jumlah baris yang diproses.
+    """
+    spool_dir = Path(spool_dir)
+    if not spool_dir.is_dir():
+        return 0
+    replayed = 0
+    for path in sorted(spool_dir.glob('*.jsonl')):
+        try:
+            file = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            continue  # baru saja diproses oleh proses lain
+        with file:
+            if not _try_lock(file) or not path.exists():
+                continue
+            rows = read_spool(file)
+            for start in range(0, len(rows), batch_size):
+                write_rows(rows[start:start + batch_size])
+            path.unlink()
+            replayed += len(rows)
+    if replayed:
+        print(f"LOG: {replayed} pesan chat dari spool lama ditulis ulang ke database")
+    return replayed
+
+
+class ChatHistoryWriter:
+    """
+    Buffer write-behind untuk ChatHistory. Flush terjadi saat buffer mencapai
+    `batch_size`, setiap `flush_interval` detik, dan saat proses berhenti.
+    Jika `flush_interval` 0, tidak ada thread latar belakang dan flush hanya
+    terjadi saat batch penuh atau flush() dipanggil.
+
+    Batch yang gagal ditulis dicoba lagi pada flush berikutnya, paling banyak
+    `max_attempts` kali. Setelah itu batch dilepas dari memori; barisnya tetap
+    ada di file spool .flushing dan bisa ditulis ulang dengan
+    `manage.py replay_chat_spool` (atau otomatis saat writer berikutnya mulai).
+    """
+
+    def __init__(self, spool_dir, batch_size=50, flush_interval=1.0, max_attempts=5):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        # Percobaan gagal berturut-turut dan spool .flushing dari percobaan tersebut
+        self._attempts = 0
+        self._flushing_paths = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._spool = None
+        self._spool_path = None
+        self._thread = None
+        self._started = False
+        self._closed = False
+        self.stats = {
+            'enqueued': 0, 'flushed': 0, 'dropped': 0, 'batches': 0, 'failed_batches': 0,
+            'abandoned_batches': 0, 'replayed': 0,
+        }
+
+    def _open_spool(self):
+        self._spool_path = self.spool_dir / f"chat-{os.getpid()}-{uuid.uuid4().hex}.jsonl"
+        self._spool = open(self._spool_path, 'a', encoding='utf-8')
+        _try_lock(self._spool)
+
+    def start(self):
+        """Menulis ulang spool yatim, membuka spool proses ini dan menjalankan thread flush."""
+        with self._lock:
+            if self._started:
+                return
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            if fcntl is not None:
+                self.stats['replayed'] += replay_orphaned_spools(self.spool_dir)
+            self._open_spool()
+            if self.flush_interval > 0:
+                self._thread = threading.Thread(target=self._run, name='chat-history-writer', daemon=True)
+                self._thread.start()
+            self._started = True
+
+    def enqueue(self, company_id, session_id, prompt, response):
+        """Mencatat satu giliran chat. Kembali segera setelah baris aman di spool."""
+        if not self._started:
+            self.start()
+        row = {
+            'message_id': str(uuid.uuid4()),
+            'company_id': company_id,
+            'session_id': session_id,
+            'prompt': prompt,
+            'response': response,
+            'created_at': timezone.now().isoformat(),
+        }
+        with self._lock:
+            self._spool.write(json.dumps(row, ensure_ascii=False) + '\n')
+            self._spool.flush()
+            self._buffer.append(row)
+            self.stats['enqueued'] += 1
+            batch_full = len(self._buffer) >= self.batch_size
+            if batch_full and self._thread is not None:
+                self._wakeup.notify()
+        if batch_full and self._thread is None:
+            self.flush()
+        return row['message_id']
+
+    def pending(self, company_id, session_id):
+        """Giliran yang belum ditulis ke database untuk satu percakapan, terbaru dulu."""
+        with self._lock:
+            return [
+                row for row in reversed(self._buffer)
+                if row['company_id'] == company_id and row['session_id'] == session_id
+            ]
+
+    def flush(self):
+        """Menulis isi buffer ke database dalam satu bulk_create. Mengembalikan jumlah baris."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                rows = list(self._buffer)
+                # Spool saat ini berisi baris buffer yang belum ada di spool .flushing sebelumnya:
+                # ganti nama (tetap terkunci) dan buka spool baru untuk pesan berikutnya.
+                flushing_file, flushing_path = self._spool, self._spool_path.with_suffix('.flushing.jsonl')
+                os.replace(self._spool_path, flushing_path)
+                self._open_spool()
+            self._flushing_paths.append(flushing_path)
+
+            try:
+                dropped = write_rows(rows)
+            except Exception as e:
+                self.stats['failed_batches'] += 1
+                self._attempts += 1
+                # Spool .flushing tetap disimpan; kuncinya dilepas agar bisa di-replay
+                flushing_file.close()
+                if self._attempts < self.max_attempts:
+                    print(f"DEBUG: Gagal menulis {len(rows)} pesan chat, akan dicoba lagi: {e}")
+                    return 0
+                # Batas percobaan habis: batch dilepas dari memori agar buffer tidak tumbuh tanpa batas
+                print(f"DEBUG: Gagal menulis {len(rows)} pesan chat {self._attempts} kali, batch dilepas; "
+                      f"jalankan replay_chat_spool untuk {len(self._flushing_paths)} file spool: {e}")
+                self._attempts = 0
+                self._flushing_paths = []
+                with self._lock:
+                    del self._buffer[:len(rows)]
+                    self.stats['abandoned_batches'] += 1
+                return 0
+
+            self._attempts = 0
+            with self._lock:
+                del self._buffer[:len(rows)]
+                self.stats['flushed'] += len(rows) - dropped
+                self.stats['dropped'] += dropped
+                self.stats['batches'] += 1
+            for path in self._flushing_paths:
+                path.unlink(missing_ok=True)
+            self._flushing_paths = []
+            flushing_file.close()
+            return len(rows)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._closed and len(self._buffer) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as e:
+                print(f"DEBUG: Thread penulis ChatHistory error: {e}")
+            if closed:
+                return
+
+    def close(self):
+        """Flush terakhir lalu menutup spool (dipanggil otomatis saat proses berhenti)."""
+        with self._lock:
+            if not self._started or self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+        with self._lock:
+            self._spool.close()
+            if not self._buffer:
+                self._spool_path.unlink(missing_ok=True)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_chat_writer():
+    """Writer milik proses ini; dibuat ulang di proses anak setelah fork (gunicorn)."""
+    global _writer, _writer_pid
+    pid = os.getpid()
+    if _writer is None or _writer_pid != pid:
+        with _writer_lock:
+            if _writer is None or _writer_pid != pid:
+                _writer = ChatHistoryWriter(
+                    settings.CHAT_SPOOL_DIR,
+                    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+                    flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+                    max_attempts=settings.CHAT_WRITE_MAX_ATTEMPTS,
+                )
+                _writer_pid = pid
+                atexit.register(_writer.close)
+    return _writer
+
+
+def pending_chat_turns(company_id, session_id):
+    """Giliran yang masih di buffer proses ini (kosong jika write-behind belum dipakai)."""
+    if _writer is None or _writer_pid != os.getpid():
+        return []
+    return _writer.pending(company_id, session_id)
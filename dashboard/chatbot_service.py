@@ -1,58 +1,324 @@
 # dashboard/chatbot_service.py
+import contextvars
 import os
+import threading
+
 import google.generativeai as genai
+from asgiref.sync import sync_to_async
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from .chatbot_tools import CompanyAwareTools # <-- Import Class, bukan modul
 from accounts.models import Company
-from .models import ChatHistory # <-- 1. Import model ChatHistory
+from .context_builder import build_context, context_fingerprint
+from .intent_router import intent_router, render_answer
+from .llm_limiter import llm_limiter
+from .llm_resilience import (
+    TRANSIENT_ERRORS, CircuitBreaker, RetryPolicy, call_with_resilience, call_with_resilience_async, gemini_breaker,
+)
+from .prompt_cache import is_self_contained, prompt_cache
+
+MODEL_NAME = 'gemini-1.5-pro-latest'
+
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+# Metode CompanyAwareTools yang boleh dipanggil oleh Gemini
+TOOL_NAMES = (
+    'get_product_count',
+    'get_product_list',
+    'get_most_expensive_product',
+    'analyze_weekly_sales_trend',
+    'forecast_sales',
+    'detect_sales_anomalies',
+)
+
+# Instance CompanyAwareTools milik request yang sedang berjalan. Model Gemini dibuat
+# sekali per proses dengan tool "proxy" yang meneruskan panggilan ke instance ini,
+# jadi skema tool tidak perlu dibangun ulang untuk setiap perusahaan/request.
+_active_tools = contextvars.ContextVar('active_tools')
+
+
+def _make_tool_proxy(name):
+    method = getattr(CompanyAwareTools, name)
+
+    def proxy():
+        return getattr(_active_tools.get(), name)()
+
+    # Nama dan docstring dipakai Gemini sebagai deklarasi fungsi
+    proxy.__name__ = proxy.__qualname__ = name
+    proxy.__doc__ = method.__doc__
+    proxy.__annotations__ = {'return': method.__annotations__.get('return')}
+    return proxy
+
+
+class ModelRegistry:
+    """
+    Menyimpan client dan GenerativeModel yang dibuat sekali per proses worker.
+    Aman untuk fork (gunicorn): proses anak selalu membuat model sendiri karena
+    koneksi gRPC milik proses induk tidak boleh dipakai bersama.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._pid = None
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._pid = None
+
+    def get_model(self):
+        pid = os.getpid()
+        if self._model is None or self._pid != pid:
+            with self._lock:
+                if self._model is None or self._pid != pid:
+                    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                    self._model = genai.GenerativeModel(
+                        model_name=MODEL_NAME,
+                        tools=[_make_tool_proxy(name) for name in TOOL_NAMES],
+                        safety_settings=SAFETY_SETTINGS,
+                    )
+                    self._pid = pid
+        return self._model
+
+
+model_registry = ModelRegistry()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=model_registry.reset)
+
+
+def _get_function_calls(response):
+    parts = response.candidates[0].content.parts if response.candidates else []
+    return [part.function_call for part in parts if "function_call" in part]
+
+
+def _function_response(name, result):
+    return genai.protos.Part(
+        function_response=genai.protos.FunctionResponse(name=name, response={'result': result})
+    )
+
+
+def _call_tool(tool_instance, name):
+    if name not in TOOL_NAMES:
+        return f"Tool '{name}' tidak tersedia."
+    return getattr(tool_instance, name)()
+
+
+def _get_cached_response(user_prompt, company, cache_context):
+    cached_response = prompt_cache.get(company.id, user_prompt, context=cache_context)
+    if cached_response is not None:
+        print(f"LOG: Jawaban dari prompt cache untuk {company.name} (hit rate {prompt_cache.hit_rate:.0%})")
+    return cached_response
+
+
+def _cache_context(company, session, user_prompt):
+    """
+    Sidik konteks untuk kunci prompt cache. Prompt yang berdiri sendiri berbagi
+    jawaban apa pun riwayatnya (pertanyaan dashboard yang diulang); prompt yang
+    merujuk giliran sebelumnya hanya berbagi jawaban untuk riwayat yang sama.
+    """
+    if is_self_contained(user_prompt):
+        return ''
+    return context_fingerprint(company, session)
+
+
+def _answer_by_intent(user_prompt, tool_instance):
+    """Menjawab langsung lewat satu tool jika intent prompt jelas, tanpa memanggil Gemini."""
+    intent = intent_router.route(user_prompt)
+    if intent is None:
+        return None
+    print(f"LOG: Intent router menjawab langsung lewat {intent}")
+    return render_answer(intent, _call_tool(tool_instance, intent))
 
-def run_chatbot_conversation(user_prompt: str, company: Company) -> str:
+
+# Deadline per panggilan dan retry untuk error sementara dari Gemini
+retry_policy = RetryPolicy()
+
+DEGRADED_PREFIX = "Maaf, asisten AI sedang tidak tersedia. Sementara itu, berikut data dari toko Anda:"
+
+
+def _degraded_answer(user_prompt, tool_instance):
+    """
+    Jawaban lokal dari CompanyAwareTools saat Gemini tidak bisa dipakai (circuit
+    terbuka atau semua percobaan gagal). Tidak disimpan di prompt cache.
+    """
+    intent = intent_router.guess(user_prompt)
+    if intent is not None:
+        answer = render_answer(intent, _call_tool(tool_instance, intent))
+    else:
+        answer = f"{render_answer('get_product_count', tool_instance.get_product_count())} {tool_instance.analyze_weekly_sales_trend()}"
+    print(f"LOG: Jawaban darurat tanpa Gemini untuk {tool_instance.company.name} (circuit {gemini_breaker.state})")
+    return f"{DEGRADED_PREFIX} {answer}"
+
+
+def _circuit_open():
+    return gemini_breaker.state == CircuitBreaker.OPEN
+
+
+def run_chatbot_conversation(user_prompt: str, company: Company, session=None) -> str:
     """
     Menjalankan sesi percakapan menggunakan instance dari CompanyAwareTools.
     SEKARANG MENYERTAKAN RIWAYAT PERCAKAPAN UNTUK MEMBERIKAN KONTEKS.
+    Pertanyaan yang sama dijawab dari prompt cache tanpa memanggil Gemini selama
+    data perusahaan belum berubah (prompt lanjutan hanya untuk riwayat yang sama), dan
+    pertanyaan data sederhana dijawab langsung oleh intent router. Panggilan Gemini melewati llm_limiter.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    genai.configure(api_key=api_key)
-
-    # 2. Ambil riwayat percakapan sebelumnya dari database
-    # Ambil 5 percakapan terakhir (paling baru) untuk menjaga konteks tetap relevan.
-    recent_conversations = ChatHistory.objects.filter(company=company)[:5]
-    
-    # Model ChatHistory sudah diurutkan dari terbaru, jadi kita balik urutannya
-    # agar menjadi kronologis (dari yang terlama ke terbaru) untuk AI.
-    past_conversations = reversed(recent_conversations)
-    
-    formatted_history = []
-    for conv in past_conversations:
-        formatted_history.append({'role': 'user', 'parts': [{'text': conv.prompt}]})
-        formatted_history.append({'role': 'model', 'parts': [{'text': conv.response}]})
-
-    # 3. Buat sebuah instance 'kotak perkakas' khusus untuk perusahaan ini
+    cache_context = _cache_context(company, session, user_prompt)
+    cached_response = _get_cached_response(user_prompt, company, cache_context)
+    if cached_response is not None:
+        return cached_response
+
+    # Buat sebuah instance 'kotak perkakas' khusus untuk perusahaan ini
     tool_instance = CompanyAwareTools(company=company)
+    routed_response = _answer_by_intent(user_prompt, tool_instance)
+    if routed_response is not None:
+        return routed_response
+    if _circuit_open():
+        return _degraded_answer(user_prompt, tool_instance)
+
+    def ask_gemini():
+        # 2. Susun riwayat percakapan sebelumnya (ringkasan + giliran terbaru) sesuai budget token
+        formatted_history = build_context(company, user_prompt, session=session)
+
+        # 4. Hubungkan instance tersebut ke tool milik model yang sudah dibuat sebelumnya
+        token = _active_tools.set(tool_instance)
+        try:
+            # 5. Mulai chat DENGAN RIWAYAT PERCAKAPAN sebagai konteks awal
+            chat = model_registry.get_model().start_chat(history=formatted_history, enable_automatic_function_calling=True)
+            response = call_with_resilience(
+                lambda: chat.send_message(user_prompt, request_options=retry_policy.request_options),
+                gemini_breaker, retry_policy,
+            )
+            print(f"LOG: Statistik tool untuk {company.name}: {dict(tool_instance.tool_stats)}")
+            prompt_cache.set(company.id, user_prompt, response.text, context=cache_context)
+            return response.text
+        except Exception as e:
+            print(f"DEBUG: Terjadi error internal saat menghubungi Gemini API: {e}")
+            return _degraded_answer(user_prompt, tool_instance)
+        finally:
+            _active_tools.reset(token)
+
+    # Dibatasi per perusahaan dan global; melempar ChatbotOverloaded jika melebihi batas
+    return llm_limiter.run(company.id, user_prompt, ask_gemini, session_id=session.id if session is not None else None)
+
+
+async def _start_async_chat(company: Company, user_prompt: str, session=None):
+    """Menyiapkan sesi chat async dengan konteks percakapan sesuai budget token."""
+    formatted_history = await sync_to_async(build_context)(company, user_prompt, session=session)
+    return model_registry.get_model().start_chat(history=formatted_history)
+
 
-    # 4. Berikan metode-metode dari instance tersebut sebagai alat ke Gemini
-    model = genai.GenerativeModel(
-        model_name='gemini-1.5-pro-latest',
-        tools=[
-            tool_instance.get_product_count,
-            tool_instance.get_product_list,
-            tool_instance.get_most_expensive_product,
-            tool_instance.analyze_weekly_sales_trend,
-        ],
-        safety_settings={
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
+def _get_text(response):
+    parts = response.candidates[0].content.parts if response.candidates else []
+    return "".join(part.text for part in parts if "text" in part)
+
+
+async def run_chatbot_conversation_async(user_prompt: str, company: Company, session=None) -> str:
+    """
+    Versi async dari run_chatbot_conversation untuk endpoint ASGI.
+    Panggilan ke Gemini di-await sehingga event loop bisa melayani request lain
+    selama menunggu. Function calling dijalankan manual: tool (yang memakai ORM)
+    dieksekusi lewat sync_to_async, bukan langsung di dalam event loop.
+    """
+    cache_context = await sync_to_async(_cache_context)(company, session, user_prompt)
+    cached_response = await sync_to_async(_get_cached_response)(user_prompt, company, cache_context)
+    if cached_response is not None:
+        return cached_response
+
+    tool_instance = CompanyAwareTools(company=company)
+    routed_response = await sync_to_async(_answer_by_intent)(user_prompt, tool_instance)
+    if routed_response is not None:
+        return routed_response
+    if _circuit_open():
+        return await sync_to_async(_degraded_answer)(user_prompt, tool_instance)
+
+    call_tool = sync_to_async(_call_tool)
+
+    async def send(chat, content):
+        return await call_with_resilience_async(
+            lambda: chat.send_message_async(content, request_options=retry_policy.request_options),
+            gemini_breaker, retry_policy,
+        )
+
+    async def ask_gemini():
+        try:
+            chat = await _start_async_chat(company, user_prompt, session=session)
+            response = await send(chat, user_prompt)
+            while function_calls := _get_function_calls(response):
+                parts = [_function_response(fc.name, await call_tool(tool_instance, fc.name)) for fc in function_calls]
+                response = await send(chat, genai.protos.Content(role='user', parts=parts))
+            print(f"LOG: Statistik tool untuk {company.name}: {dict(tool_instance.tool_stats)}")
+            await sync_to_async(prompt_cache.set)(company.id, user_prompt, response.text, context=cache_context)
+            return response.text
+        except Exception as e:
+            print(f"DEBUG: Terjadi error internal saat menghubungi Gemini API: {e}")
+            return await sync_to_async(_degraded_answer)(user_prompt, tool_instance)
+
+    return await llm_limiter.run_async(
+        company.id, user_prompt, ask_gemini, session_id=session.id if session is not None else None,
     )
 
-    # 5. Mulai chat DENGAN RIWAYAT PERCAKAPAN sebagai konteks awal
-    chat = model.start_chat(history=formatted_history, enable_automatic_function_calling=True)
 
-    try:
-        response = chat.send_message(user_prompt)
-        return response.text
-    except Exception as e:
-        print(f"DEBUG: Terjadi error internal saat menghubungi Gemini API: {e}")
-        return "Maaf, terjadi kesalahan pada sistem AI kami. Silakan cek terminal Django untuk detail error."
+async def stream_chatbot_conversation(user_prompt: str, company: Company, session=None):
+    """
+    Seperti run_chatbot_conversation_async, tetapi menghasilkan (yield) potongan
+    teks jawaban begitu diterima dari Gemini (stream=True). SDK tidak mendukung
+    function calling otomatis saat streaming, jadi function call yang muncul di
+    stream dieksekusi manual lalu hasilnya dikirim kembali sebagai stream baru.
+    """
+    cache_context = await sync_to_async(_cache_context)(company, session, user_prompt)
+    cached_response = await sync_to_async(_get_cached_response)(user_prompt, company, cache_context)
+    if cached_response is not None:
+        yield cached_response
+        return
+
+    tool_instance = CompanyAwareTools(company=company)
+    routed_response = await sync_to_async(_answer_by_intent)(user_prompt, tool_instance)
+    if routed_response is not None:
+        yield routed_response
+        return
+    if _circuit_open():
+        yield await sync_to_async(_degraded_answer)(user_prompt, tool_instance)
+        return
+
+    call_tool = sync_to_async(_call_tool)
+    chunks = []
+
+    # Slot limiter dipegang sampai stream selesai. Penolakan (ChatbotOverloaded) terjadi
+    # sebelum potongan pertama, jadi view masih bisa membalas 429.
+    async with llm_limiter.limit_async(company.id):
+        try:
+            chat = await _start_async_chat(company, user_prompt, session=session)
+            content = user_prompt
+            while content is not None:
+                function_calls = []
+                # Retry hanya sampai potongan pertama diterima; potongan yang sudah dikirim tidak bisa ditarik
+                stream = await call_with_resilience_async(
+                    lambda: chat.send_message_async(content, stream=True, request_options=retry_policy.request_options),
+                    gemini_breaker, retry_policy,
+                )
+                try:
+                    async for chunk in stream:
+                        function_calls.extend(_get_function_calls(chunk))
+                        text = _get_text(chunk)
+                        if text:
+                            chunks.append(text)
+                            yield text
+                except TRANSIENT_ERRORS:
+                    # Stream terputus di tengah jalan: dihitung sebagai kegagalan Gemini
+                    gemini_breaker.record_failure()
+                    raise
+                content = None
+                if function_calls:
+                    parts = [_function_response(fc.name, await call_tool(tool_instance, fc.name)) for fc in function_calls]
+                    content = genai.protos.Content(role='user', parts=parts)
+            print(f"LOG: Statistik tool untuk {company.name}: {dict(tool_instance.tool_stats)}")
+            await sync_to_async(prompt_cache.set)(company.id, user_prompt, "".join(chunks), context=cache_context)
+        except Exception as e:
+            # Error tool (mis. database) bukan kegagalan Gemini, jadi tidak dicatat ke breaker
+            print(f"DEBUG: Terjadi error internal saat menghubungi Gemini API: {e}")
+            yield await sync_to_async(_degraded_answer)(user_prompt, tool_instance)
@@ -1,11 +1,22 @@
 # dashboard/chatbot_tools.py
 import random
+from collections import defaultdict
+from decimal import Decimal
 from .models import Product
 from accounts.models import Company
-from .models import Product, Sale 
+from .models import Product, DailySalesRollup, ProductInsight
+from .cache import tenant_cached
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Sum
+from django.db.models import Q, Sum
+from .analytics import build_sales_report, load_sales_history
+
+# Insight yang lebih tua dari ini dianggap basi (batch `score_product_insights` tidak berjalan)
+INSIGHT_MAX_AGE_DAYS = 2
+
+# Riwayat yang dianalisis oleh tool analitik, dan minimum hari agar pola mingguan terbaca
+ANALYTICS_HISTORY_DAYS = 90
+ANALYTICS_MIN_DAYS = 14
 
 class CompanyAwareTools:
     """
@@ -15,51 +26,112 @@ class CompanyAwareTools:
     def __init__(self, company: Company):
         # Saat 'kotak' ini dibuat, kita simpan informasi perusahaannya.
         self.company = company
+        # Satu instance dipakai untuk satu giliran chatbot. Katalog produk dimuat
+        # sekali lalu dipakai ulang oleh pemanggilan tool berikutnya di giliran yang sama.
+        self._catalogue = None
+        self._memo = {}
+        self.tool_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def _record(self, tool_name, hit):
+        self.tool_stats[tool_name]['hits' if hit else 'misses'] += 1
+
+    def _get_catalogue(self, tool_name):
+        """
+        Snapshot (nama, harga) semua produk perusahaan, diambil dengan satu query
+        ringan (.values_list) saat pertama kali dibutuhkan.
+        """
+        hit = self._catalogue is not None
+        if not hit:
+            self._catalogue = list(
+                Product.objects.filter(company=self.company).order_by('id').values_list('name', 'price')
+            )
+        self._record(tool_name, hit)
+        return self._catalogue
+
+    def _memoize(self, tool_name, compute):
+        """Menyimpan hasil tool untuk pemanggilan berikutnya dalam giliran yang sama."""
+        hit = tool_name in self._memo
+        if not hit:
+            self._memo[tool_name] = compute()
+        self._record(tool_name, hit)
+        return self._memo[tool_name]
+
+    @tenant_cached
+    def _count_products(self):
+        return Product.objects.filter(company=self.company).count()
 
     def get_product_count(self) -> int:
         """
         Mengembalikan jumlah total produk untuk perusahaan ini.
         """
         print(f"LOG: Menjalankan get_product_count untuk {self.company.name}...")
-        return Product.objects.filter(company=self.company).count()
+        if self._catalogue is not None:
+            return len(self._get_catalogue('get_product_count'))
+        return self._memoize('get_product_count', self._count_products)
 
     def get_product_list(self) -> str:
         """
         Mengembalikan daftar nama semua produk untuk perusahaan ini, dipisahkan koma.
         """
         print(f"LOG: Menjalankan get_product_list untuk {self.company.name}...")
-        products = Product.objects.filter(company=self.company)
-        if not products:
+        catalogue = self._get_catalogue('get_product_list')
+        if not catalogue:
             return "Tidak ada produk yang ditemukan untuk perusahaan Anda."
-        return ", ".join([p.name for p in products])
+        return ", ".join(name for name, price in catalogue)
 
     def get_most_expensive_product(self) -> str:
         """
         Menemukan dan mengembalikan nama produk termahal untuk perusahaan ini.
         """
         print(f"LOG: Menjalankan get_most_expensive_product untuk {self.company.name}...")
-        product = Product.objects.filter(company=self.company).order_by('-price').first()
-        if product:
-            return f"Produk termahal Anda adalah {product.name} dengan harga Rp {product.price:,.0f}."
+        catalogue = self._get_catalogue('get_most_expensive_product')
+        if catalogue:
+            name, price = max(catalogue, key=lambda item: item[1])
+            return f"Produk termahal Anda adalah {name} dengan harga Rp {price:,.0f}."
         return "Tidak ada produk di database perusahaan Anda."
 
+    @tenant_cached
+    def get_weekly_revenue(self) -> dict:
+        """
+        Menghitung pendapatan 7 hari terakhir (termasuk hari ini) dan 7 hari sebelumnya
+        dalam SATU query agregasi bersyarat pada tabel DailySalesRollup, sehingga biayanya
+        bergantung pada jumlah hari dan produk, bukan jumlah transaksi.
+        """
+        today = timezone.localdate()
+        start_current_week = today - timedelta(days=6)
+        start_previous_week = start_current_week - timedelta(days=7)
+
+        totals = DailySalesRollup.objects.filter(
+            company=self.company,
+            day__gte=start_previous_week,
+        ).aggregate(
+            current_week=Sum('revenue', filter=Q(day__gte=start_current_week)),
+            previous_week=Sum('revenue', filter=Q(day__lt=start_current_week)),
+        )
+
+        revenue_current_week = totals['current_week'] or Decimal('0')
+        revenue_previous_week = totals['previous_week'] or Decimal('0')
+
+        percentage_change = None
+        if revenue_previous_week:
+            percentage_change = ((revenue_current_week - revenue_previous_week) / revenue_previous_week) * 100
+
+        return {
+            'current_week': revenue_current_week,
+            'previous_week': revenue_previous_week,
+            'percentage_change': percentage_change,
+        }
+
     def analyze_weekly_sales_trend(self) -> str:
         """
         Menganalisis total pendapatan penjualan dari 7 hari terakhir dan membandingkannya
         dengan 7 hari sebelumnya untuk memberikan analisis tren.
         """
         print(f"LOG: Menjalankan analyze_weekly_sales_trend untuk {self.company.name}...")
-        now = timezone.now()
-        
-        # Hitung pendapatan 7 hari terakhir
-        start_current_week = now - timedelta(days=7)
-        sales_current_week = Sale.objects.filter(company=self.company, sale_date__gte=start_current_week)
-        revenue_current_week = sum(item.product.price * item.quantity for item in sales_current_week)
-
-        # Hitung pendapatan 7 hari sebelumnya
-        start_previous_week = start_current_week - timedelta(days=7)
-        sales_previous_week = Sale.objects.filter(company=self.company, sale_date__gte=start_previous_week, sale_date__lt=start_current_week)
-        revenue_previous_week = sum(item.product.price * item.quantity for item in sales_previous_week)
+        revenue = self._memoize('analyze_weekly_sales_trend', self.get_weekly_revenue)
+        revenue_current_week = revenue['current_week']
+        revenue_previous_week = revenue['previous_week']
+        percentage_change = revenue['percentage_change']
 
         # Analisis dan buat respons
         if revenue_current_week == 0 and revenue_previous_week == 0:
@@ -68,8 +140,6 @@ class CompanyAwareTools:
         if revenue_previous_week == 0:
              return f"Penjualan minggu ini dimulai dengan baik dengan total pendapatan Rp {revenue_current_week:,.0f}."
 
-        percentage_change = ((revenue_current_week - revenue_previous_week) / revenue_previous_week) * 100
-        
         if percentage_change > 0:
             trend = f"naik sebesar {percentage_change:.2f}%"
         elif percentage_change < 0:
@@ -80,32 +150,113 @@ class CompanyAwareTools:
         return (f"Analisis tren penjualan mingguan: Pendapatan 7 hari terakhir adalah Rp {revenue_current_week:,.0f}. "
                 f"Ini {trend} dibandingkan dengan 7 hari sebelumnya (Rp {revenue_previous_week:,.0f}).")
 
-    def get_proactive_suggestion(self) -> str:
+    @tenant_cached
+    def get_sales_analytics(self) -> dict:
         """
-        Menganalisis data penjualan 30 hari terakhir untuk menemukan produk
-        yang paling kurang laku dan memberikan saran promosi.
+        Laporan analitik penjualan ANALYTICS_HISTORY_DAYS hari terakhir (rolling
+        average, pola per hari, perkiraan 7 hari, anomali), dihitung dari satu
+        query rollup harian.
         """
-        print(f"LOG: Menjalankan get_proactive_suggestion untuk {self.company.name}...")
-        thirty_days_ago = timezone.now() - timedelta(days=30)
+        return build_sales_report(load_sales_history(self.company, ANALYTICS_HISTORY_DAYS))
+
+    def forecast_sales(self) -> str:
+        """
+        Memperkirakan pendapatan 7 hari ke depan berdasarkan tren dan pola penjualan
+        per hari (Senin-Minggu) dari riwayat penjualan perusahaan ini.
+        """
+        print(f"LOG: Menjalankan forecast_sales untuk {self.company.name}...")
+        report = self._memoize('get_sales_analytics', self.get_sales_analytics)
+        if report['history_days'] < ANALYTICS_MIN_DAYS:
+            return (f"Data penjualan belum cukup untuk membuat perkiraan "
+                    f"(butuh minimal {ANALYTICS_MIN_DAYS} hari riwayat penjualan).")
+
+        seasonality = report['seasonality']
+        busiest = max(seasonality, key=seasonality.get)
+        quietest = min(seasonality, key=seasonality.get)
+        per_day = ", ".join(f"{row['day']}: Rp {row['revenue']:,.0f}" for row in report['forecast'])
+        return (f"Perkiraan pendapatan 7 hari ke depan adalah sekitar Rp {report['forecast_total']:,.0f} ({per_day}). "
+                f"Hari paling ramai biasanya {busiest} dan paling sepi {quietest}.")
+
+    def detect_sales_anomalies(self) -> str:
+        """
+        Mendeteksi hari-hari dengan pendapatan yang tidak wajar (jauh di atas atau di
+        bawah rata-rata 28 hari sebelumnya) dalam riwayat penjualan perusahaan ini.
+        """
+        print(f"LOG: Menjalankan detect_sales_anomalies untuk {self.company.name}...")
+        report = self._memoize('get_sales_analytics', self.get_sales_analytics)
+        if report['history_days'] < ANALYTICS_MIN_DAYS:
+            return (f"Data penjualan belum cukup untuk mendeteksi anomali "
+                    f"(butuh minimal {ANALYTICS_MIN_DAYS} hari riwayat penjualan).")
+
+        anomalies = report['anomalies']
+        if not anomalies:
+            return f"Tidak ada anomali penjualan dalam {report['history_days']} hari terakhir; penjualan Anda stabil."
+        details = "; ".join(
+            f"{row['day']} (Rp {row['revenue']:,.0f}, {'lonjakan' if row['z_score'] > 0 else 'penurunan'})"
+            for row in anomalies[-5:]
+        )
+        return f"Ditemukan {len(anomalies)} hari dengan penjualan tidak wajar. Terbaru: {details}."
+
+    @tenant_cached
+    def get_least_sold_product(self):
+        """
+        Mengembalikan nama produk yang paling sedikit terjual dalam 30 hari terakhir
+        (berdasarkan rollup harian), atau None jika belum ada penjualan.
+        """
+        thirty_days_ago = timezone.localdate() - timedelta(days=29)
         
-        # Hitung total penjualan per produk dalam 30 hari terakhir
-        sales_data = Sale.objects.filter(
+        # Hitung total penjualan per produk dalam 30 hari terakhir dari rollup harian
+        least_sold = DailySalesRollup.objects.filter(
             company=self.company, 
-            sale_date__gte=thirty_days_ago
-        ).values('product__name').annotate(total_quantity=Sum('quantity')).order_by('total_quantity')
+            day__gte=thirty_days_ago
+        ).values('product__name').annotate(total_quantity=Sum('quantity')).order_by('total_quantity').first()
 
-        if not sales_data:
-            return "Saran Proaktif: Data penjualan bulan ini masih kosong. Coba catat penjualan Anda untuk mendapatkan saran dari saya!"
+        return least_sold['product__name'] if least_sold else None
 
-        # Ambil produk yang paling sedikit terjual
-        least_sold_product = sales_data[0]
-        product_name = least_sold_product['product__name']
-        
+    def get_top_insight(self):
+        """
+        ProductInsight dengan skor tertinggi (satu lookup pada index company, -score),
+        atau None jika batch belum pernah dijalankan atau hasilnya sudah basi.
+        """
+        insight = (
+            ProductInsight.objects.filter(company=self.company)
+            .select_related('product').order_by('-score').first()
+        )
+        if insight is None or insight.as_of < timezone.localdate() - timedelta(days=INSIGHT_MAX_AGE_DAYS):
+            return None
+        return insight
+
+    def _promotion_suggestion(self, product_name):
         # Siapkan beberapa variasi saran
         suggestions = [
             f"Produk '{product_name}' tampaknya kurang diminati bulan ini. Coba tawarkan promo 'Beli 1 Gratis 1' akhir pekan ini untuk meningkatkan penjualannya.",
             f"Untuk meningkatkan popularitas '{product_name}', coba tawarkan sebagai paket bundling dengan produk terlaris Anda.",
             f"Pertimbangkan untuk memberikan diskon 15% khusus untuk produk '{product_name}' untuk menarik perhatian pelanggan."
         ]
-        
-        return f"Saran Proaktif: {random.choice(suggestions)}"
\ No newline at end of file
+        return random.choice(suggestions)
+
+    def get_proactive_suggestion(self) -> str:
+        """
+        Memberikan saran promosi untuk produk yang paling perlu perhatian: produk
+        tanpa penjualan 30 hari terakhir, produk yang penjualannya turun tajam
+        dibanding minggu lalu, atau produk yang paling kurang laku.
+        """
+        print(f"LOG: Menjalankan get_proactive_suggestion untuk {self.company.name}...")
+        insight = self.get_top_insight()
+        if insight is not None:
+            product_name = insight.product.name
+            if insight.zero_sales:
+                return (f"Saran Proaktif: Produk '{product_name}' belum terjual sama sekali dalam 30 hari terakhir. "
+                        f"Coba tampilkan di posisi utama atau tawarkan harga perkenalan agar pelanggan mau mencoba.")
+            if insight.wow_change is not None and insight.wow_change <= -20:
+                return (f"Saran Proaktif: Penjualan '{product_name}' turun {abs(insight.wow_change):.0f}% dibanding minggu lalu "
+                        f"({insight.units_last_week} menjadi {insight.units_this_week} unit). Coba ingatkan pelanggan lewat promo singkat minggu ini.")
+            return f"Saran Proaktif: {self._promotion_suggestion(product_name)}"
+
+        # Batch belum tersedia: hitung langsung dari rollup
+        product_name = self.get_least_sold_product()
+
+        if product_name is None:
+            return "Saran Proaktif: Data penjualan bulan ini masih kosong. Coba catat penjualan Anda untuk mendapatkan saran dari saya!"
+
+        return f"Saran Proaktif: {self._promotion_suggestion(product_name)}"
\ No newline at end of file
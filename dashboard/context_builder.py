@@ -0,0 +1,186 @@
+# dashboard/context_builder.py
+import hashlib
+import json
+import math
+import re
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .chat_writer import pending_chat_turns
+from .models import ChatHistory, ConversationSummary
+
+# Estimasi ~4 karakter per token. Tokenizer Gemini hanya tersedia lewat API
+# (count_tokens), terlalu mahal untuk dipanggil di setiap request.
+CHARS_PER_TOKEN = 4
+# Jumlah giliran terbaru yang dipertimbangkan untuk dikirim utuh
+MAX_RECENT_TURNS = 20
+# Giliran lama yang diringkas per request; giliran yang lebih lama dari ini
+# tidak akan muat di ringkasan bergulir.
+MAX_SUMMARY_UPDATES = 50
+
+SUMMARY_PREFIX = "Ringkasan percakapan sebelumnya:\n"
+SUMMARY_ACK = "Baik, saya akan memakai ringkasan ini sebagai konteks."
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:max(limit - 1, 0)].rstrip() + "…"
+
+
+def _first_sentence(text, max_chars):
+    sentence = re.split(r'(?<=[.!?])\s', text.strip(), maxsplit=1)[0]
+    sentence = ' '.join(sentence.split())
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 1].rstrip() + "…"
+
+
+def summarize_turn(prompt, response):
+    """Ringkasan ekstraktif satu giliran: kalimat pertama prompt dan jawaban."""
+    return f"- User: {_first_sentence(prompt, 150)} | Bot: {_first_sentence(response, 250)}"
+
+
+def roll_summary(summary, new_lines, max_tokens):
+    """Menambahkan baris baru ke ringkasan lalu membuang baris terlama sampai muat di max_tokens."""
+    lines = [line for line in summary.splitlines() if line] + new_lines
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+
+class ContextMetrics:
+    """Statistik jumlah token (estimasi) yang dikirim ke Gemini per request, per proses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+
+    def record(self, tokens):
+        with self._lock:
+            self.requests += 1
+            self.total_tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+
+    @property
+    def average_tokens(self):
+        return self.total_tokens / self.requests if self.requests else 0.0
+
+
+context_metrics = ContextMetrics()
+
+
+def _update_summary(turns, summary, before_id, max_tokens):
+    """Meringkas giliran dengan id di antara summary.last_chat_id dan before_id (eksklusif)."""
+    pending = turns.filter(id__gt=summary.last_chat_id)
+    if before_id is not None:
+        pending = pending.filter(id__lt=before_id)
+    pending = list(pending.order_by('-id').values('id', 'prompt', 'response')[:MAX_SUMMARY_UPDATES])
+    if not pending:
+        return summary.summary
+
+    pending.reverse()
+    new_summary = roll_summary(summary.summary, [summarize_turn(t['prompt'], t['response']) for t in pending], max_tokens)
+    # Update bersyarat: jika request lain sudah memperbarui ringkasan lebih dulu, hasil ini dilewati
+    ConversationSummary.objects.filter(pk=summary.pk, last_chat_id=summary.last_chat_id).update(
+        summary=new_summary, last_chat_id=pending[-1]['id'], updated_at=timezone.now(),
+    )
+    return new_summary
+
+
+def _history(company, session):
+    if session is not None:
+        return ChatHistory.objects.filter(session=session)
+    return ChatHistory.objects.filter(company=company, session__isnull=True)
+
+
+def context_fingerprint(company, session=None):
+    """
+    Hash dari giliran terbaru yang akan dipertimbangkan build_context (termasuk yang
+    masih di buffer write-behind), atau '' jika percakapan belum punya riwayat.
+    Dipakai sebagai bagian kunci prompt cache untuk prompt yang merujuk riwayat.
+    """
+    pending = pending_chat_turns(company.id, session.id if session is not None else None)
+    turns = [[turn['prompt'], turn['response']] for turn in pending]
+    turns += [list(turn) for turn in _history(company, session).values_list('prompt', 'response')[:MAX_RECENT_TURNS]]
+    if not turns:
+        return ''
+    return hashlib.sha256(json.dumps(turns[:MAX_RECENT_TURNS]).encode('utf-8')).hexdigest()
+
+
+def build_context(company, user_prompt, session=None, budget=None):
+    """
+    Menyusun riwayat percakapan untuk Gemini yang muat dalam budget token
+    (CHATBOT_CONTEXT_TOKEN_BUDGET, termasuk prompt saat ini). Giliran terbaru
+    dikirim utuh (dipotong jika terlalu panjang) sampai budget habis; giliran
+    yang lebih lama diwakili oleh ringkasan bergulir dari ConversationSummary.
+
+    Riwayat diambil dari `session` saja (satu query pada index sesi), atau dari
+    riwayat perusahaan yang tidak terhubung ke sesi mana pun jika session None.
+    """
+    budget = budget or settings.CHATBOT_CONTEXT_TOKEN_BUDGET
+    summary_budget = budget // 4
+    turn_limit = budget // 2
+
+    prompt_tokens = estimate_tokens(user_prompt)
+    turns = _history(company, session)
+    recent = list(turns.values('id', 'prompt', 'response')[:MAX_RECENT_TURNS])
+    # Giliran yang masih di buffer write-behind (id None) lebih baru dari semua baris di database
+    pending = pending_chat_turns(company.id, session.id if session is not None else None)
+    if pending:
+        pending = [{'id': None, 'prompt': t['prompt'], 'response': t['response']} for t in pending]
+        recent = (pending + recent)[:MAX_RECENT_TURNS]
+
+    available = budget - prompt_tokens - summary_budget
+    included, used = [], 0
+    for turn in recent:
+        prompt = truncate_to_tokens(turn['prompt'], turn_limit // 2)
+        response = truncate_to_tokens(turn['response'], turn_limit - estimate_tokens(prompt))
+        cost = estimate_tokens(prompt) + estimate_tokens(response)
+        if used + cost > available:
+            break
+        included.append((prompt, response))
+        used += cost
+
+    summary_text = ""
+    if len(included) < len(recent) or len(recent) == MAX_RECENT_TURNS:
+        summary, _ = ConversationSummary.objects.get_or_create(company=company, session=session)
+        if len(included) < len(recent):
+            boundary = recent[len(included)]['id']
+            before_id = boundary + 1 if boundary is not None else None
+        else:
+            before_id = recent[-1]['id']
+        # before_id None: batasnya giliran yang belum tersimpan, jadi semua baris di database diringkas
+        summary_text = _update_summary(turns, summary, before_id, summary_budget - estimate_tokens(SUMMARY_PREFIX + SUMMARY_ACK))
+
+    history = []
+    summary_tokens = 0
+    if summary_text:
+        history.append({'role': 'user', 'parts': [{'text': SUMMARY_PREFIX + summary_text}]})
+        history.append({'role': 'model', 'parts': [{'text': SUMMARY_ACK}]})
+        summary_tokens = estimate_tokens(SUMMARY_PREFIX + summary_text) + estimate_tokens(SUMMARY_ACK)
+    for prompt, response in reversed(included):
+        history.append({'role': 'user', 'parts': [{'text': prompt}]})
+        history.append({'role': 'model', 'parts': [{'text': response}]})
+
+    tokens = prompt_tokens + used + summary_tokens
+    context_metrics.record(tokens)
+    print(f"LOG: Konteks chatbot untuk {company.name}: {tokens} token dari budget {budget} "
+          f"({len(included)} giliran utuh, ringkasan {summary_tokens} token, "
+          f"rata-rata {context_metrics.average_tokens:.0f} token/request)")
+    return history
@@ -0,0 +1,56 @@
+# dashboard/db_operations.py
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddConstraint, AddIndex
+
+
+class AddIndexConcurrentlyIfPostgres(AddIndexConcurrently):
+    """
+    Membuat index dengan CREATE INDEX CONCURRENTLY di PostgreSQL (tanpa mengunci
+    tabel dari operasi tulis). Di database lain (misalnya SQLite untuk development
+    dan tes) operasi ini berperilaku seperti AddIndex biasa.
+    Migration yang memakainya harus menyetel `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class AddUniqueConstraintConcurrentlyIfPostgres(AddConstraint):
+    """
+    Menambahkan UniqueConstraint berbasis kolom tanpa mengunci tabel selama index
+    dibangun. Di PostgreSQL, index unik dibuat dengan CREATE UNIQUE INDEX
+    CONCURRENTLY lalu dipasang sebagai constraint dengan
+    ALTER TABLE ... ADD CONSTRAINT ... UNIQUE USING INDEX (hanya perubahan
+    katalog, kunci ACCESS EXCLUSIVE-nya sesaat). AddConstraint biasa membangun
+    index sambil memegang kunci tersebut sehingga semua baca/tulis tabel terhenti.
+    Di database lain berperilaku seperti AddConstraint biasa.
+    Migration yang memakainya harus menyetel `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                f"{type(self).__name__} tidak bisa dijalankan di dalam transaksi; setel atomic = False pada migration."
+            )
+        quote = schema_editor.quote_name
+        name = quote(self.constraint.name)
+        table = quote(model._meta.db_table)
+        columns = ", ".join(quote(model._meta.get_field(field).column) for field in self.constraint.fields)
+        schema_editor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})")
+        schema_editor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+
+    def describe(self):
+        return f"Concurrently create unique constraint {self.constraint.name} on model {self.model_name}"
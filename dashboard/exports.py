@@ -0,0 +1,164 @@
+# dashboard/exports.py
+"""
+Ekspor data perusahaan (produk, penjualan, riwayat chat) ke CSV atau XLSX
+secara streaming. Baris dibaca dari database per chunk (.iterator, server-side
+cursor di PostgreSQL) dan langsung ditulis ke output, jadi memori yang dipakai
+tetap sama berapa pun jumlah baris perusahaan.
+"""
+import csv
+import io
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .importers import NAME_COLUMN, PRICE_COLUMN
+from .models import ChatHistory, Product, Sale
+
+EXPORT_CHUNK_SIZE = 2000
+# Ukuran potongan byte yang dikirim ke klien per iterasi StreamingHttpResponse
+STREAM_BUFFER_SIZE = 64 * 1024
+# Batas baris per worksheet Excel (termasuk header); sisanya pindah ke sheet berikutnya
+XLSX_MAX_ROWS = 1_048_576
+XLSX_MAX_CELL_LENGTH = 32_767
+# Awalan teks yang dibaca Excel/LibreOffice sebagai rumus (CSV/formula injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportDataset:
+    """Satu jenis data yang bisa diekspor: header kolom dan query per perusahaan."""
+
+    def __init__(self, title, header, fields, queryset, ordering):
+        self.title = title
+        self.header = header
+        self.fields = fields
+        self.queryset = queryset
+        self.ordering = ordering
+
+    def rows(self, company, chunk_size=EXPORT_CHUNK_SIZE):
+        """Tuple nilai per baris, dibaca dari database per `chunk_size` baris."""
+        rows = self.queryset().filter(company=company).order_by(*self.ordering).values_list(*self.fields)
+        return rows.iterator(chunk_size=chunk_size)
+
+
+# Kolom produk memakai nama kolom import, jadi file ekspor bisa langsung diimpor ulang
+EXPORT_DATASETS = {
+    'products': ExportDataset(
+        'Produk',
+        ['ID', NAME_COLUMN, PRICE_COLUMN, 'Dibuat'],
+        ['id', 'name', 'price', 'created_at'],
+        Product.objects.all,
+        ['created_at', 'id'],
+    ),
+    'sales': ExportDataset(
+        'Penjualan',
+        ['ID', 'ID Transaksi', 'Waktu', 'ID Produk', 'Nama Produk', 'Jumlah', 'Harga Satuan', 'Total'],
+        ['id', 'transaction_id', 'sale_date', 'product_id', 'product__name', 'quantity', 'unit_price', 'line_total'],
+        Sale.objects.all,
+        ['sale_date', 'id'],
+    ),
+    'chat-history': ExportDataset(
+        'Riwayat Chat',
+        ['ID', 'ID Sesi', 'Waktu', 'Pertanyaan', 'Jawaban'],
+        ['id', 'session_id', 'created_at', 'prompt', 'response'],
+        ChatHistory.objects.all,
+        ['created_at', 'id'],
+    ),
+}
+
+
+def _local(value):
+    return timezone.localtime(value) if timezone.is_aware(value) else value
+
+
+def _neutralize_formula(value):
+    """
+    Teks dari pengguna (nama produk, prompt chat) yang diawali karakter rumus
+    diberi awalan ' agar ditampilkan sebagai teks, bukan dijalankan sebagai rumus.
+    Kolom angka tidak melewati fungsi ini, jadi harga negatif tetap angka.
+    """
+    if value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return _local(value).isoformat()
+    if isinstance(value, str):
+        return _neutralize_formula(value)
+    return value
+
+
+def iter_csv(dataset, company):
+    """
+    Isi file CSV sebagai potongan string berukuran ~STREAM_BUFFER_SIZE.
+    Diawali BOM agar Excel membaca UTF-8 dengan benar.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(dataset.header)
+    for row in dataset.rows(company):
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= STREAM_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx_value(value):
+    if isinstance(value, datetime):
+        # Excel tidak mengenal zona waktu: simpan sebagai waktu lokal
+        return timezone.make_naive(value) if timezone.is_aware(value) else value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, str):
+        return _neutralize_formula(value)[:XLSX_MAX_CELL_LENGTH]
+    return value
+
+
+def write_xlsx(dataset, company, file):
+    """
+    Menulis workbook XLSX ke `file` dengan mode write_only openpyxl: setiap baris
+    langsung diserialisasi ke XML sementara dan tidak disimpan di memori.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = XLSX_MAX_ROWS
+    sheets = 0
+    for row in dataset.rows(company):
+        if sheet_rows >= XLSX_MAX_ROWS:
+            sheets += 1
+            sheet = workbook.create_sheet(dataset.title if sheets == 1 else f"{dataset.title} {sheets}")
+            sheet.append(dataset.header)
+            sheet_rows = 1
+        sheet.append([_xlsx_value(value) for value in row])
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(dataset.title).append(dataset.header)
+    workbook.save(file)
+
+
+def iter_xlsx(dataset, company):
+    """
+    Isi file XLSX sebagai potongan bytes. Format zip XLSX baru bisa dikirim
+    setelah workbook selesai, jadi workbook ditulis dulu ke file sementara di
+    disk (bukan di memori) lalu dialirkan per STREAM_BUFFER_SIZE byte.
+    """
+    with tempfile.TemporaryFile() as file:
+        write_xlsx(dataset, company, file)
+        file.seek(0)
+        while chunk := file.read(STREAM_BUFFER_SIZE):
+            yield chunk
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (iter_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -0,0 +1,65 @@
+# dashboard/fast_serializers.py
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+class ValuesRowSerializer:
+    """
+    Serializer read-only untuk baris hasil `.values()`, sebagai jalur cepat
+    pengganti ModelSerializer(many=True) pada endpoint daftar.
+
+    Tidak ada objek model maupun instance serializer per baris yang dibuat.
+    Format output tetap mengikuti `serializer_class`: field Decimal dan DateTime
+    diformat persis seperti field DRF-nya, field lain dikirim apa adanya.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        declared = serializer_class().fields
+        self.fields = list(fields) if fields is not None else list(declared)
+        self.declared = {name: declared[name] for name in self.fields}
+
+    def _decimal_formatter(self, field):
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+            return field.to_representation
+        exponent = -field.decimal_places
+
+        def format_decimal(value):
+            # Nilai dari database biasanya sudah berskala sesuai kolom; hanya
+            # nilai lain yang perlu di-quantize oleh field DRF.
+            if value is None or value.as_tuple().exponent != exponent:
+                return field.to_representation(value)
+            return '{:f}'.format(value)
+        return format_decimal
+
+    def _datetime_formatter(self, field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        field_timezone = getattr(field, 'timezone', None) or (timezone.get_current_timezone() if settings.USE_TZ else None)
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        def format_datetime(value):
+            if not value or timezone.is_naive(value):
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return format_datetime
+
+    def serialize(self, rows):
+        formatters = {}
+        for name, field in self.declared.items():
+            if isinstance(field, serializers.DecimalField):
+                formatters[name] = self._decimal_formatter(field)
+            elif isinstance(field, serializers.DateTimeField):
+                formatters[name] = self._datetime_formatter(field)
+
+        fields = self.fields
+        data = []
+        for row in rows:
+            item = {name: row[name] for name in fields}
+            for name, formatter in formatters.items():
+                item[name] = formatter(item[name])
+            data.append(item)
+        return data
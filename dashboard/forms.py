@@ -2,4 +2,4 @@
 from django import forms
 
 class UploadFileForm(forms.Form):
-    file = forms.FileField(label="Pilih File Excel")
\ No newline at end of file
+    file = forms.FileField(label="Pilih File Excel (.xlsx) atau CSV")
\ No newline at end of file
@@ -0,0 +1,94 @@
+# dashboard/import_jobs.py
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .importers import import_products
+from .models import ImportJob
+
+
+def enqueue_import(file, company):
+    """Menyimpan file upload sebagai ImportJob baru berstatus 'pending'."""
+    payload = b''.join(file.chunks())
+    return ImportJob.objects.create(company=company, file_name=file.name, payload=payload)
+
+
+def claim_next_job():
+    """
+    Mengambil satu job 'pending' tertua dan menandainya 'running'.
+    SELECT ... FOR UPDATE SKIP LOCKED memastikan beberapa worker tidak
+    mengambil job yang sama (di SQLite hanya satu worker yang didukung).
+    """
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportJob.STATUS_PENDING)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def requeue_stale_jobs(older_than):
+    """Mengembalikan job 'running' yang macet (misalnya worker mati) ke antrean."""
+    return ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - older_than,
+    ).update(status=ImportJob.STATUS_PENDING, started_at=None)
+
+
+def run_import_job(job):
+    """Menjalankan import untuk satu job dan mencatat progres setelah setiap batch."""
+    jobs = ImportJob.objects.filter(pk=job.pk)
+
+    def report_progress(result):
+        jobs.update(
+            total_rows=result['total_rows'],
+            created_count=result['created'],
+            updated_count=result['updated'],
+            error_count=result['error_count'],
+        )
+
+    try:
+        result = import_products(
+            ContentFile(bytes(job.payload), name=job.file_name),
+            job.company,
+            progress=report_progress,
+        )
+    except Exception as e:
+        jobs.update(
+            status=ImportJob.STATUS_FAILED,
+            message=f"Terjadi error: {e}",
+            payload=b'',
+            finished_at=timezone.now(),
+        )
+        return
+
+    jobs.update(
+        status=ImportJob.STATUS_DONE,
+        total_rows=result['total_rows'],
+        created_count=result['created'],
+        updated_count=result['updated'],
+        error_count=result['error_count'],
+        errors=result['errors'],
+        message=f"{result['created']} produk baru ditambahkan, {result['updated']} produk diperbarui.",
+        payload=b'',
+        finished_at=timezone.now(),
+    )
+
+
+def process_pending_jobs(max_jobs=None):
+    """Memproses job 'pending' sampai antrean kosong. Mengembalikan jumlah job yang diproses."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_import_job(job)
+        processed += 1
+    return processed
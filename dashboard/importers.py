@@ -0,0 +1,158 @@
+# dashboard/importers.py
+import codecs
+import csv
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .cache import bump_data_version
+from .models import Product
+
+NAME_COLUMN = 'Nama Produk'
+PRICE_COLUMN = 'Harga'
+MAX_PRICE = Decimal('99999999.99')  # Batas Product.price (max_digits=10, decimal_places=2)
+MAX_REPORTED_ERRORS = 100
+
+
+def _find_columns(header):
+    """Mencari posisi kolom wajib pada baris header file."""
+    header = [str(cell).strip() if cell is not None else '' for cell in header]
+    if NAME_COLUMN not in header or PRICE_COLUMN not in header:
+        raise ValueError(f"File harus memiliki kolom '{NAME_COLUMN}' dan '{PRICE_COLUMN}'")
+    return header.index(NAME_COLUMN), header.index(PRICE_COLUMN)
+
+
+def _iter_csv_rows(file):
+    # File dibaca per baris, tidak pernah dimuat utuh ke memori.
+    return csv.reader(codecs.iterdecode(file, 'utf-8-sig'))
+
+
+def _iter_xlsx_rows(file):
+    # Mode read_only membaca worksheet secara streaming dari file zip.
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_product_rows(file):
+    """
+    Menghasilkan tuple (nomor_baris, nama, harga_mentah) dari file CSV atau XLSX.
+    Nomor baris mengikuti penomoran di spreadsheet (header = baris 1).
+    """
+    extension = os.path.splitext(file.name or '')[1].lower()
+    if extension == '.csv':
+        rows = _iter_csv_rows(file)
+    elif extension in ('.xlsx', '.xlsm'):
+        rows = _iter_xlsx_rows(file)
+    else:
+        raise ValueError("Format file tidak didukung. Gunakan file .csv atau .xlsx")
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("File kosong.")
+    name_index, price_index = _find_columns(header)
+
+    for row_number, row in enumerate(rows, start=2):
+        if not row or all(cell is None or str(cell).strip() == '' for cell in row):
+            continue
+        name = row[name_index] if name_index < len(row) else None
+        price = row[price_index] if price_index < len(row) else None
+        yield row_number, name, price
+
+
+def parse_product_row(name, price):
+    """
+    Memvalidasi satu baris produk dan mengembalikan (nama, harga) yang sudah bersih.
+    Melempar ValueError dengan pesan yang bisa ditampilkan ke pengguna.
+    """
+    name = str(name).strip() if name is not None else ''
+    if not name:
+        raise ValueError("Nama Produk kosong")
+    if len(name) > Product._meta.get_field('name').max_length:
+        raise ValueError("Nama Produk terlalu panjang (maksimal 200 karakter)")
+
+    if price is None or str(price).strip() == '':
+        raise ValueError("Harga kosong")
+    try:
+        price = Decimal(str(price).strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Harga '{price}' bukan angka yang valid")
+    if not price.is_finite():
+        # NaN lolos dari quantize dan membuat perbandingan di bawah melempar InvalidOperation
+        raise ValueError(f"Harga '{price}' bukan angka yang valid")
+    if price < 0:
+        raise ValueError("Harga tidak boleh negatif")
+    if price > MAX_PRICE:
+        raise ValueError("Harga terlalu besar")
+    return name, price
+
+
+def upsert_product_batch(company, prices_by_name):
+    """
+    Menyimpan satu batch produk dalam satu transaksi: produk dengan nama yang sudah
+    ada di perusahaan ini diperbarui harganya (bulk_update), sisanya dibuat (bulk_create).
+    Mengembalikan tuple (jumlah_dibuat, jumlah_diperbarui).
+    """
+    with transaction.atomic():
+        existing = list(Product.objects.filter(company=company, name__in=prices_by_name.keys()))
+        found_names = set()
+        changed = []
+        for product in existing:
+            found_names.add(product.name)
+            new_price = prices_by_name[product.name]
+            if product.price != new_price:
+                product.price = new_price
+                changed.append(product)
+        if changed:
+            Product.objects.bulk_update(changed, ['price'])
+
+        new_products = [
+            Product(company=company, name=name, price=price)
+            for name, price in prices_by_name.items()
+            if name not in found_names
+        ]
+        Product.objects.bulk_create(new_products)
+        # bulk_create/bulk_update tidak memicu signal, jadi invalidasi cache dilakukan manual
+        bump_data_version(company.id)
+    return len(new_products), len(found_names)
+
+
+def import_products(file, company, batch_size=500, progress=None):
+    """
+    Mengimpor produk dari file CSV/XLSX secara streaming, per batch.
+    Baris yang tidak valid dilewati dan dilaporkan per nomor baris.
+    `progress`, jika diberikan, dipanggil setelah setiap batch dengan ringkasan sementara.
+    """
+    result = {'total_rows': 0, 'created': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    batch = {}
+
+    def flush():
+        created, updated = upsert_product_batch(company, batch)
+        result['created'] += created
+        result['updated'] += updated
+        batch.clear()
+        if progress:
+            progress(result)
+
+    for row_number, name, price in iter_product_rows(file):
+        result['total_rows'] += 1
+        try:
+            name, price = parse_product_row(name, price)
+        except ValueError as e:
+            result['error_count'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'row': row_number, 'error': str(e)})
+            continue
+
+        # Nama yang sama muncul dua kali dalam satu batch: baris terakhir yang dipakai.
+        batch[name] = price
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return result
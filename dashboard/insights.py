@@ -0,0 +1,130 @@
+# dashboard/insights.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .models import DailySalesRollup, Product, ProductInsight
+
+WINDOW_DAYS = 30
+
+INSIGHT_FIELDS = [
+    'as_of', 'units_30d', 'revenue_30d', 'velocity', 'units_this_week',
+    'units_last_week', 'wow_change', 'zero_sales', 'score',
+]
+
+
+def days_listed(created_at, as_of):
+    """Jumlah hari produk sudah terdaftar di dalam jendela (1..WINDOW_DAYS)."""
+    return max(1, min(WINDOW_DAYS, (as_of - timezone.localdate(created_at)).days + 1))
+
+
+def score_insight(velocity, wow_change, zero_sales, listed_days):
+    """
+    Skor 0..100, semakin tinggi semakin perlu perhatian:
+    - produk tanpa penjualan sama sekali: hingga 100, sebanding lama produk terdaftar;
+    - produk lain: 50 / (1 + unit per hari), ditambah hingga 50 poin jika penjualan
+      minggu ini turun dibanding minggu lalu.
+    """
+    if zero_sales:
+        return 100.0 * listed_days / WINDOW_DAYS
+    decline = min(100.0, -wow_change) / 2 if wow_change is not None and wow_change < 0 else 0.0
+    return 50.0 / (1 + velocity) + decline
+
+
+def _build_insight(company_id, product_id, created_at, as_of, units_30d=0, revenue_30d=None,
+                   units_this_week=0, units_last_week=0):
+    listed = days_listed(created_at, as_of)
+    zero_sales = units_30d == 0
+    velocity = units_30d / listed
+    wow_change = None
+    if units_last_week:
+        wow_change = (units_this_week - units_last_week) / units_last_week * 100
+    return ProductInsight(
+        company_id=company_id,
+        product_id=product_id,
+        as_of=as_of,
+        units_30d=units_30d,
+        revenue_30d=revenue_30d or Decimal('0'),
+        velocity=velocity,
+        units_this_week=units_this_week,
+        units_last_week=units_last_week,
+        wow_change=wow_change,
+        zero_sales=zero_sales,
+        score=score_insight(velocity, wow_change, zero_sales, listed),
+    )
+
+
+def score_product_insights(as_of=None, company=None, batch_size=1000):
+    """
+    Menghitung ProductInsight untuk semua produk (atau satu perusahaan) dalam
+    satu pass, lalu menyimpannya dengan bulk upsert. Mengembalikan jumlah produk.
+
+    - Produk yang terjual: satu agregasi DailySalesRollup 30 hari terakhir,
+      dikelompokkan per produk (unit 30 hari, minggu ini, minggu lalu).
+    - Produk tanpa penjualan: anti-join Product terhadap rollup di jendela yang sama
+      (NOT EXISTS), sehingga produk yang tidak pernah muncul di Sale ikut terdeteksi.
+
+    Kedua query dibaca bertahap (iterator), jadi waktu proses sebanding dengan
+    jumlah baris rollup + produk dan memori tetap sebesar satu batch.
+    """
+    as_of = as_of or timezone.localdate()
+    window_start = as_of - timedelta(days=WINDOW_DAYS - 1)
+    this_week_start = as_of - timedelta(days=6)
+    last_week_start = as_of - timedelta(days=13)
+
+    window = DailySalesRollup.objects.filter(day__gte=window_start, day__lte=as_of)
+    products = Product.objects.all()
+    if company is not None:
+        window = window.filter(company=company)
+        products = products.filter(company=company)
+
+    sold = (
+        window.values('company_id', 'product_id', 'product__created_at')
+        .annotate(
+            units_30d=Sum('quantity'),
+            revenue_30d=Sum('revenue'),
+            units_this_week=Sum('quantity', filter=Q(day__gte=this_week_start)),
+            units_last_week=Sum('quantity', filter=Q(day__gte=last_week_start, day__lt=this_week_start)),
+        )
+        .order_by()
+    )
+    unsold = (
+        products.filter(~Exists(window.filter(product=OuterRef('pk'))))
+        .values('company_id', 'id', 'created_at')
+        .order_by()
+    )
+
+    def rows():
+        for row in sold.iterator(chunk_size=batch_size):
+            yield _build_insight(
+                row['company_id'], row['product_id'], row['product__created_at'], as_of,
+                units_30d=row['units_30d'] or 0,
+                revenue_30d=row['revenue_30d'],
+                units_this_week=row['units_this_week'] or 0,
+                units_last_week=row['units_last_week'] or 0,
+            )
+        for row in unsold.iterator(chunk_size=batch_size):
+            yield _build_insight(row['company_id'], row['id'], row['created_at'], as_of)
+
+    scored = 0
+    with transaction.atomic():
+        batch = []
+        for insight in rows():
+            batch.append(insight)
+            if len(batch) >= batch_size:
+                _upsert(batch)
+                scored += len(batch)
+                batch = []
+        if batch:
+            _upsert(batch)
+            scored += len(batch)
+    return scored
+
+
+def _upsert(batch):
+    ProductInsight.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=['product'], update_fields=INSIGHT_FIELDS + ['computed_at'],
+    )
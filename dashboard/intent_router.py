@@ -0,0 +1,338 @@
+# dashboard/intent_router.py
+import json
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from .prompt_cache import FILLER_WORDS, normalize_prompt
+
+OTHER = 'other'
+
+EVAL_SET_PATH = Path(__file__).resolve().parent / 'data' / 'intent_eval.json'
+
+# Contoh berlabel (Indonesia/Inggris) untuk melatih klasifikasi naive Bayes.
+# Label = nama metode CompanyAwareTools, atau OTHER jika harus dijawab Gemini.
+TRAINING_EXAMPLES = [
+    ("berapa jumlah produk saya", 'get_product_count'),
+    ("ada berapa produk di toko saya", 'get_product_count'),
+    ("total produk yang saya punya berapa", 'get_product_count'),
+    ("jumlah barang saya ada berapa", 'get_product_count'),
+    ("berapa banyak produk yang terdaftar", 'get_product_count'),
+    ("hitung produk saya", 'get_product_count'),
+    ("saya punya berapa item", 'get_product_count'),
+    ("how many products do i have", 'get_product_count'),
+    ("number of products in my store", 'get_product_count'),
+    ("count my products", 'get_product_count'),
+    ("total number of items", 'get_product_count'),
+    ("how many items are listed", 'get_product_count'),
+    ("berapa produk yang saya punya", 'get_product_count'),
+    ("how many products are in my store", 'get_product_count'),
+    ("jumlah produk yang saya miliki", 'get_product_count'),
+    ("berapa barang di katalog saya", 'get_product_count'),
+    ("count of products in my catalog", 'get_product_count'),
+    ("count the items in my catalog", 'get_product_count'),
+
+    ("daftar produk saya", 'get_product_list'),
+    ("tampilkan semua produk", 'get_product_list'),
+    ("apa saja produk yang saya jual", 'get_product_list'),
+    ("sebutkan produk saya", 'get_product_list'),
+    ("lihat daftar barang", 'get_product_list'),
+    ("produk apa saja yang ada", 'get_product_list'),
+    ("nama nama produk saya", 'get_product_list'),
+    ("list my products", 'get_product_list'),
+    ("show all products", 'get_product_list'),
+    ("what products do i sell", 'get_product_list'),
+    ("which products do i have", 'get_product_list'),
+    ("product names in my catalogue", 'get_product_list'),
+    ("lihat produk saya", 'get_product_list'),
+    ("tunjukkan semua barang", 'get_product_list'),
+    ("semua produk yang dijual", 'get_product_list'),
+    ("barang apa saja yang saya punya", 'get_product_list'),
+    ("show my products", 'get_product_list'),
+    ("list all products", 'get_product_list'),
+    ("products available in my shop", 'get_product_list'),
+    ("show me all my items", 'get_product_list'),
+    ("what products are in my store", 'get_product_list'),
+
+    ("produk termahal saya apa", 'get_most_expensive_product'),
+    ("apa produk paling mahal", 'get_most_expensive_product'),
+    ("yang termahal", 'get_most_expensive_product'),
+    ("barang dengan harga tertinggi", 'get_most_expensive_product'),
+    ("produk mana yang paling mahal", 'get_most_expensive_product'),
+    ("harga produk termahal berapa", 'get_most_expensive_product'),
+    ("tunjukkan produk termahal", 'get_most_expensive_product'),
+    ("what is my most expensive product", 'get_most_expensive_product'),
+    ("which product has the highest price", 'get_most_expensive_product'),
+    ("priciest item in my store", 'get_most_expensive_product'),
+    ("most expensive item", 'get_most_expensive_product'),
+    ("barang termahal", 'get_most_expensive_product'),
+    ("yang paling mahal apa", 'get_most_expensive_product'),
+    ("harga tertinggi di toko saya", 'get_most_expensive_product'),
+    ("barang mana yang harganya paling tinggi", 'get_most_expensive_product'),
+    ("priciest product", 'get_most_expensive_product'),
+    ("my most expensive product", 'get_most_expensive_product'),
+    ("my priciest item", 'get_most_expensive_product'),
+
+    ("bagaimana tren penjualan minggu ini", 'analyze_weekly_sales_trend'),
+    ("penjualan minggu ini naik atau turun", 'analyze_weekly_sales_trend'),
+    ("berapa pendapatan minggu ini", 'analyze_weekly_sales_trend'),
+    ("analisis penjualan mingguan", 'analyze_weekly_sales_trend'),
+    ("omzet 7 hari terakhir", 'analyze_weekly_sales_trend'),
+    ("bandingkan penjualan minggu ini dengan minggu lalu", 'analyze_weekly_sales_trend'),
+    ("tren pendapatan mingguan saya", 'analyze_weekly_sales_trend'),
+    ("how are my sales this week", 'analyze_weekly_sales_trend'),
+    ("weekly sales trend", 'analyze_weekly_sales_trend'),
+    ("revenue this week compared to last week", 'analyze_weekly_sales_trend'),
+    ("sales in the last 7 days", 'analyze_weekly_sales_trend'),
+    ("is my weekly revenue going up", 'analyze_weekly_sales_trend'),
+    ("omzet seminggu ini", 'analyze_weekly_sales_trend'),
+    ("pendapatan seminggu terakhir naik atau turun", 'analyze_weekly_sales_trend'),
+    ("penjualan seminggu terakhir", 'analyze_weekly_sales_trend'),
+    ("sales trend this week", 'analyze_weekly_sales_trend'),
+    ("omzet minggu ini dibanding minggu lalu", 'analyze_weekly_sales_trend'),
+    ("penjualan minggu ini gimana", 'analyze_weekly_sales_trend'),
+    ("analisis tren pendapatan saya", 'analyze_weekly_sales_trend'),
+    ("tren omzet toko saya", 'analyze_weekly_sales_trend'),
+    ("compare my revenue this week with last week", 'analyze_weekly_sales_trend'),
+    ("how were sales in the last 7 days", 'analyze_weekly_sales_trend'),
+
+    ("halo", OTHER),
+    ("selamat pagi", OTHER),
+    ("terima kasih", OTHER),
+    ("bagaimana cara meningkatkan penjualan", OTHER),
+    ("kenapa produk saya tidak laku", OTHER),
+    ("beri saya ide promosi untuk produk baru", OTHER),
+    ("buatkan caption instagram untuk kopi susu", OTHER),
+    ("strategi harga yang cocok untuk umkm", OTHER),
+    ("tips mengelola stok barang", OTHER),
+    ("apa itu margin keuntungan", OTHER),
+    ("tolong jelaskan cara menghitung hpp", OTHER),
+    ("siapa kamu", OTHER),
+    ("hello", OTHER),
+    ("thank you", OTHER),
+    ("how can i increase my sales", OTHER),
+    ("why are my products not selling", OTHER),
+    ("write a marketing email for my shop", OTHER),
+    ("give me pricing strategy advice", OTHER),
+    ("what is a good discount for slow products", OTHER),
+    ("explain profit margin", OTHER),
+    ("produk apa yang paling laris", OTHER),
+    ("produk yang paling sedikit terjual", OTHER),
+    ("best selling product this month", OTHER),
+    ("penjualan bulan lalu berapa", OTHER),
+    ("produk termurah saya", OTHER),
+    ("produk yang terjual hari ini", OTHER),
+    ("penjualan bulan ini", OTHER),
+    ("products under a certain price", OTHER),
+    ("cheapest product", OTHER),
+    ("sales last month", OTHER),
+    ("apa yang paling tinggi penjualannya", OTHER),
+    ("produk mana yang paling tinggi margin", OTHER),
+    ("how many items did i sell this week", OTHER),
+    ("berapa produk yang terjual minggu ini", OTHER),
+    ("total penjualan minggu ini untuk kopi susu", OTHER),
+]
+
+# Aturan kata kunci presisi tinggi per intent.
+RULES = {
+    'get_product_count': re.compile(
+        r'\b(berapa|jumlah|total|hitung|how many|number of|count)\b.*\b(produk|barang|item|items|products?)\b'
+        r'|\b(produk|barang|item|items|products?)\b.*\b(berapa|how many)\b'
+    ),
+    'get_product_list': re.compile(
+        r'\b(daftar|sebutkan|tampilkan|tunjukkan|lihat|apa saja|list|show|which)\b.*\b(produk|barang|products?)\b'
+        r'|\bproduk apa saja\b'
+    ),
+    # "tertinggi"/"paling tinggi" hanya berarti termahal jika menyebut harga ("paling tinggi penjualannya" bukan)
+    'get_most_expensive_product': re.compile(
+        r'\b(termahal|paling mahal|most expensive|highest price|priciest)\b'
+        r'|\bharga(nya)? (tertinggi|paling tinggi)\b'
+    ),
+    'analyze_weekly_sales_trend': re.compile(
+        r'\b(tren|trend|mingguan|weekly)\b'
+        r'|\b(penjualan|pendapatan|omzet|sales|revenue)\b.*\b(minggu|seminggu|week|7 hari|7 days)\b'
+    ),
+}
+
+# Pengecualian per intent: "berapa item yang saya jual minggu ini" menanyakan penjualan, bukan jumlah katalog
+RULE_EXCLUSIONS = {
+    'get_product_count': re.compile(r'\b(jual|dijual|menjual|terjual|penjualan|sell|sells|sold|selling|sales)\b'),
+}
+
+# Kata umum yang boleh muncul di pertanyaan data tanpa mengubah maksudnya
+GENERIC_WORDS = frozenset({
+    's', 'the', 'a', 'an', 'is', 'are', 'was', 'were', 'do', 'does', 'did', 'i', 'me', 'my', 'in', 'of', 'with',
+    'di', 'ke', 'yang', 'ada', 'apa', 'mana', 'dan', 'atau', 'saya', 'aku',
+})
+
+# Pertanyaan saran/penjelasan selalu diteruskan ke Gemini walau menyebut data.
+ADVICE_PATTERN = re.compile(
+    r'\b(kenapa|mengapa|bagaimana cara|gimana cara|cara|saran|strategi|tips|ide|buatkan|jelaskan|'
+    r'why|how can|how do|how to|advice|suggest|strategy|idea|ideas|write|explain)\b'
+)
+
+# Filter, periode, atau peringkat yang tidak bisa dijawab tool mana pun
+# ("produk termurah", "produk di bawah 10000", "penjualan bulan ini",
+# "produk yang terjual hari ini", "termahal kedua"): diteruskan ke Gemini.
+UNSUPPORTED_PATTERN = re.compile(
+    r'\b(termurah|paling murah|cheapest|lowest price|'
+    r'di bawah|di atas|lebih dari|kurang dari|under|below|above|over|priced|'
+    r'kedua|ketiga|second|third|'
+    r'tidak|belum|bukan|not|never|without|tanpa|'
+    r'terjual|sold|laku|laris|best selling|'
+    r'hari ini|today|kemarin|yesterday|bulan|month|tahun|year)\b'
+)
+# Tool mingguan membandingkan minggu ini dengan minggu lalu; "minggu lalu" saja tidak didukung
+LAST_WEEK_PATTERN = re.compile(r'\b(minggu lalu|last week)\b')
+THIS_WEEK_PATTERN = re.compile(r'\b(minggu ini|this week)\b')
+
+
+def tokenize(normalized):
+    words = normalized.split()
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentClassifier:
+    """Multinomial naive Bayes kecil (unigram + bigram kata, Laplace smoothing)."""
+
+    def __init__(self, examples):
+        self.word_counts = defaultdict(Counter)
+        label_counts = Counter()
+        for text, label in examples:
+            label_counts[label] += 1
+            self.word_counts[label].update(tokenize(normalize_prompt(text)))
+        total = sum(label_counts.values())
+        self.log_priors = {label: math.log(count / total) for label, count in label_counts.items()}
+        self.vocabulary = set().union(*self.word_counts.values())
+        self.totals = {label: sum(counts.values()) for label, counts in self.word_counts.items()}
+
+    def predict_proba(self, normalized):
+        tokens = [token for token in tokenize(normalized) if token in self.vocabulary]
+        scores = {}
+        for label, log_prior in self.log_priors.items():
+            denominator = self.totals[label] + len(self.vocabulary)
+            counts = self.word_counts[label]
+            scores[label] = log_prior + sum(math.log((counts[token] + 1) / denominator) for token in tokens)
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exps.values())
+        return {label: value / total for label, value in exps.items()}
+
+
+class IntentRouter:
+    """
+    Menentukan apakah sebuah prompt cukup dijawab langsung oleh satu metode
+    CompanyAwareTools. Prompt hanya di-route jika cocok dengan aturan kata kunci
+    sebuah intent DAN classifier naive Bayes memilih intent yang sama dengan
+    keyakinan minimal `threshold`. Pertanyaan dengan filter/periode yang tidak
+    didukung tool, atau yang memuat kata di luar kosakata pertanyaan data (nama
+    produk, filter), selalu ditolak. Jika tidak yakin, route() mengembalikan None
+    dan prompt diteruskan ke Gemini.
+    """
+
+    def __init__(self, examples=TRAINING_EXAMPLES, threshold=0.8):
+        self.classifier = NaiveBayesIntentClassifier(examples)
+        # Kosakata pertanyaan data. Kata di luar kosakata ini biasanya nama produk atau
+        # filter ("... untuk kopi susu") yang tidak didukung tool, jadi diteruskan ke Gemini.
+        self.known_words = set(GENERIC_WORDS | FILLER_WORDS)
+        for text, label in examples:
+            if label != OTHER:
+                self.known_words.update(normalize_prompt(text).split())
+        self.threshold = threshold
+        self.stats = Counter()
+
+    def route(self, prompt):
+        intent = self._classify(prompt)
+        self.stats[intent or 'fallback'] += 1
+        return intent
+
+    def _classify(self, prompt):
+        normalized = normalize_prompt(prompt)
+        if not normalized or ADVICE_PATTERN.search(normalized):
+            return None
+
+        if UNSUPPORTED_PATTERN.search(normalized):
+            return None
+        if LAST_WEEK_PATTERN.search(normalized) and not THIS_WEEK_PATTERN.search(normalized):
+            return None
+        if any(word not in self.known_words for word in normalized.split()):
+            return None
+
+        # Aturan dan classifier harus sepakat, dan classifier harus cukup yakin
+        matched = [
+            intent for intent, pattern in RULES.items()
+            if pattern.search(normalized) and not (intent in RULE_EXCLUSIONS and RULE_EXCLUSIONS[intent].search(normalized))
+        ]
+        if not matched:
+            return None
+        probabilities = self.classifier.predict_proba(normalized)
+        intent = max(probabilities, key=probabilities.get)
+        if intent not in matched or probabilities[intent] < self.threshold:
+            return None
+        return intent
+
+    def guess(self, prompt):
+        """
+        Intent data yang disebut prompt menurut aturan kata kunci, tanpa ambang
+        keyakinan dan tanpa pengecualian pertanyaan saran. Dipakai untuk jawaban
+        darurat saat Gemini tidak tersedia; None jika tidak ada yang cocok.
+        """
+        normalized = normalize_prompt(prompt)
+        matched = [intent for intent, pattern in RULES.items() if pattern.search(normalized)]
+        return matched[0] if matched else None
+
+
+# Template jawaban untuk tool yang mengembalikan data mentah
+TEMPLATES = {
+    'get_product_count': "Anda memiliki {result} produk.",
+    'get_product_list': "Produk Anda: {result}.",
+}
+
+
+def render_answer(intent, result):
+    if intent == 'get_product_list' and result.startswith("Tidak ada produk"):
+        return result
+    return TEMPLATES.get(intent, "{result}").format(result=result)
+
+
+def load_eval_set(path=EVAL_SET_PATH):
+    with open(path, encoding='utf-8') as f:
+        return [(item['prompt'], item['intent']) for item in json.load(f)]
+
+
+def evaluate_router(router, examples):
+    """
+    Mengukur router pada contoh berlabel. `precision` = porsi prompt yang di-route
+    ke tool yang benar; `coverage` = porsi pertanyaan data yang berhasil di-route.
+    """
+    per_intent = defaultdict(lambda: {'routed': 0, 'correct': 0})
+    routed = correct = data_questions = 0
+    mistakes = []
+    start = time.perf_counter()
+    for prompt, expected in examples:
+        intent = router._classify(prompt)
+        data_questions += expected != OTHER
+        if intent is None:
+            continue
+        routed += 1
+        per_intent[intent]['routed'] += 1
+        if intent == expected:
+            correct += 1
+            per_intent[intent]['correct'] += 1
+        else:
+            mistakes.append({'prompt': prompt, 'expected': expected, 'routed_to': intent})
+    elapsed = time.perf_counter() - start
+    return {
+        'examples': len(examples),
+        'routed': routed,
+        'precision': correct / routed if routed else 0.0,
+        'coverage': correct / data_questions if data_questions else 0.0,
+        'per_intent': dict(per_intent),
+        'mistakes': mistakes,
+        'avg_latency_ms': elapsed * 1000 / len(examples) if examples else 0.0,
+    }
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,269 @@
+# dashboard/llm_limiter.py
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .prompt_cache import normalize_prompt
+
+
+class ChatbotOverloaded(Exception):
+    """Permintaan ke Gemini ditolak limiter; `retry_after` dalam detik (untuk header Retry-After)."""
+
+    def __init__(self, retry_after, reason):
+        super().__init__(f"Permintaan chatbot ditolak ({reason}), coba lagi dalam {retry_after} detik")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """Token bucket per perusahaan: `rate` token per detik, maksimal `capacity` token tersimpan."""
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, now):
+        """Mengambil satu token. Mengembalikan 0 jika berhasil, atau lama menunggu (detik) sampai ada token."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _InFlight:
+    """Satu panggilan Gemini yang sedang berjalan; request identik menunggu hasilnya di sini."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = []  # (event loop, future) milik follower async
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _resolve_future(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class LLMLimiter:
+    """
+    Membatasi panggilan Gemini per proses worker:
+
+    - token bucket per perusahaan (CHATBOT_RATE_PER_MINUTE, burst CHATBOT_RATE_BURST),
+      agar satu tenant tidak menghabiskan kuota API;
+    - batas panggilan bersamaan untuk semua perusahaan (CHATBOT_MAX_CONCURRENT_CALLS).
+      Request yang melebihi batas menunggu di antrean maksimal CHATBOT_MAX_QUEUE
+      request selama CHATBOT_QUEUE_TIMEOUT detik;
+    - prompt identik (setelah dinormalisasi) dari percakapan yang sama (perusahaan
+      + sesi, karena riwayat sesi ikut dikirim ke Gemini) yang masuk saat panggilan
+      pertama masih berjalan ikut memakai hasil panggilan tersebut (coalescing),
+      tanpa memakai token maupun slot.
+
+    Request yang ditolak mendapat ChatbotOverloaded, yang oleh view dijadikan
+    HTTP 429 dengan header Retry-After.
+    """
+
+    def __init__(self, rate_per_minute=None, burst=None, max_concurrent=None, max_queue=None,
+                 queue_timeout=None, clock=time.monotonic):
+        self.rate = (rate_per_minute or settings.CHATBOT_RATE_PER_MINUTE) / 60
+        self.burst = burst or settings.CHATBOT_RATE_BURST
+        self.max_concurrent = max_concurrent or settings.CHATBOT_MAX_CONCURRENT_CALLS
+        self.max_queue = settings.CHATBOT_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = settings.CHATBOT_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(threading.Lock())
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._buckets = {}
+            self._inflight = {}
+        with self._slots:
+            self._active = 0
+            self._waiting = 0
+            # Rata-rata bergerak durasi panggilan, untuk memperkirakan Retry-After saat penuh
+            self._avg_duration = 1.0
+        self.stats = {
+            'admitted': 0, 'coalesced': 0, 'rejected_rate_limit': 0, 'rejected_capacity': 0,
+            'max_queue_depth': 0,
+        }
+
+    @property
+    def queue_depth(self):
+        return self._waiting
+
+    @property
+    def active_calls(self):
+        return self._active
+
+    def snapshot(self):
+        return {**self.stats, 'queue_depth': self._waiting, 'active_calls': self._active}
+
+    def _join_or_lead(self, key):
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.stats['coalesced'] += 1
+                return flight, False
+            flight = self._inflight[key] = _InFlight()
+            return flight, True
+
+    def _finish(self, key, flight, result=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            flight.result, flight.error = result, error
+            flight.event.set()
+            waiters, flight.waiters = flight.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_future, future, result, error)
+            except RuntimeError:
+                pass  # event loop follower sudah ditutup
+
+    def _take_token(self, company_id):
+        with self._lock:
+            bucket = self._buckets.get(company_id)
+            if bucket is None:
+                bucket = self._buckets[company_id] = TokenBucket(self.rate, self.burst, self.clock())
+            wait = bucket.take(self.clock())
+            if wait:
+                self.stats['rejected_rate_limit'] += 1
+        if wait:
+            print(f"LOG: Limiter chatbot menolak perusahaan {company_id} (rate limit, tunggu {wait:.1f} detik)")
+            raise ChatbotOverloaded(max(1, math.ceil(wait)), 'rate_limit')
+
+    def _reject_capacity(self):
+        self.stats['rejected_capacity'] += 1
+        retry_after = max(1, math.ceil(self._avg_duration))
+        print(f"LOG: Limiter chatbot penuh ({self._active} panggilan aktif, antrean {self._waiting})")
+        return ChatbotOverloaded(retry_after, 'capacity')
+
+    def _try_acquire_slot(self):
+        with self._slots:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                return True
+            return False
+
+    def _acquire_slot(self):
+        with self._slots:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                return
+            if self._waiting >= self.max_queue:
+                raise self._reject_capacity()
+            self._waiting += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._waiting)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject_capacity()
+                    self._slots.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+
+    def _release_slot(self, duration):
+        with self._slots:
+            self._active -= 1
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            self._slots.notify()
+
+    def _count_admitted(self):
+        with self._lock:
+            self.stats['admitted'] += 1
+
+    def _admit(self, company_id):
+        self._take_token(company_id)
+        self._acquire_slot()
+        self._count_admitted()
+
+    async def _admit_async(self, company_id):
+        self._take_token(company_id)
+        if not self._try_acquire_slot():
+            # Menunggu slot di thread terpisah agar event loop tidak terblokir
+            await sync_to_async(self._acquire_slot, thread_sensitive=False)()
+        self._count_admitted()
+
+    def run(self, company_id, prompt, call, session_id=None):
+        """
+        Menjalankan `call()` (panggilan Gemini) di bawah limiter; prompt identik dalam
+        percakapan yang sama (`session_id`, None untuk riwayat tanpa sesi) berbagi hasil.
+        """
+        key = (company_id, session_id, normalize_prompt(prompt))
+        flight, leader = self._join_or_lead(key)
+        if not leader:
+            flight.event.wait()
+            return flight.outcome()
+
+        try:
+            self._admit(company_id)
+            start = time.monotonic()
+            try:
+                result = call()
+            finally:
+                self._release_slot(time.monotonic() - start)
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    async def run_async(self, company_id, prompt, call, session_id=None):
+        """Versi async dari run(); `call` adalah fungsi async."""
+        key = (company_id, session_id, normalize_prompt(prompt))
+        flight, leader = self._join_or_lead(key)
+        if not leader:
+            future = asyncio.get_running_loop().create_future()
+            with self._lock:
+                if flight.event.is_set():
+                    return flight.outcome()
+                flight.waiters.append((asyncio.get_running_loop(), future))
+            return await future
+
+        try:
+            await self._admit_async(company_id)
+            start = time.monotonic()
+            try:
+                result = await call()
+            finally:
+                self._release_slot(time.monotonic() - start)
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    @asynccontextmanager
+    async def limit_async(self, company_id):
+        """Token dan slot untuk satu jawaban streaming (tanpa coalescing), dilepas saat stream selesai."""
+        await self._admit_async(company_id)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release_slot(time.monotonic() - start)
+
+
+llm_limiter = LLMLimiter()
@@ -0,0 +1,184 @@
+# dashboard/llm_resilience.py
+import asyncio
+import random
+import threading
+import time
+
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+# Error sementara dari Gemini yang layak dicoba ulang
+TRANSIENT_ERRORS = (
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.Aborted,
+    google_exceptions.Unknown,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+class LLMUnavailable(Exception):
+    """Gemini tidak bisa dipakai: circuit breaker terbuka atau semua percobaan gagal."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker untuk panggilan Gemini, per proses worker.
+
+    Setelah `failure_threshold` kegagalan berturut-turut, circuit terbuka dan
+    panggilan langsung ditolak selama `reset_timeout` detik. Setelah itu satu
+    panggilan percobaan (half-open) diizinkan: berhasil menutup circuit, gagal
+    membukanya lagi.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold or settings.CHATBOT_BREAKER_FAILURES
+        self.reset_timeout = settings.CHATBOT_BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._trial_running = False
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """True jika panggilan boleh dilakukan sekarang."""
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self):
+        """
+        Panggilan selesai dengan error yang tidak menunjukkan Gemini bermasalah
+        (request tidak valid, error tool/database): slot percobaan half-open
+        dilepas tanpa mengubah status maupun hitungan kegagalan.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.stats['opened'] += 1
+                    print(f"LOG: Circuit breaker Gemini terbuka setelah {self._failures} kegagalan")
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                self._trial_running = False
+
+
+class RetryPolicy:
+    """Retry dengan exponential backoff + full jitter: jeda acak antara 0 dan base * 2^percobaan."""
+
+    def __init__(self, retries=None, base_delay=None, max_delay=None, timeout=None):
+        self.retries = settings.CHATBOT_LLM_RETRIES if retries is None else retries
+        self.base_delay = settings.CHATBOT_LLM_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = max_delay or settings.CHATBOT_LLM_RETRY_MAX_DELAY
+        self.timeout = timeout or settings.CHATBOT_LLM_TIMEOUT
+
+    @property
+    def request_options(self):
+        """Deadline per panggilan yang diteruskan ke client Gemini."""
+        return {'timeout': self.timeout}
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def call_with_resilience(call, breaker, policy):
+    """
+    Menjalankan `call()` (satu panggilan Gemini) dengan retry untuk error sementara.
+    Melempar LLMUnavailable jika circuit terbuka atau semua percobaan gagal. Hanya
+    TRANSIENT_ERRORS yang dihitung sebagai kegagalan oleh breaker; error lain
+    dilempar ulang apa adanya.
+    """
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise LLMUnavailable("Circuit breaker Gemini sedang terbuka")
+        try:
+            result = call()
+        except TRANSIENT_ERRORS as e:
+            breaker.record_failure()
+            if attempt >= policy.retries:
+                raise LLMUnavailable(f"Panggilan Gemini gagal setelah {attempt + 1} percobaan: {e!r}") from e
+            delay = policy.delay(attempt)
+            print(f"LOG: Panggilan Gemini gagal ({e!r}), percobaan ulang dalam {delay:.2f} detik")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        except Exception:
+            # Error permanen (mis. request tidak valid) tidak dicoba ulang dan tidak dihitung breaker
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def call_with_resilience_async(call, breaker, policy):
+    """
+    Versi async dari call_with_resilience; `call` adalah fungsi async. Deadline juga
+    ditegakkan di sisi klien (asyncio.wait_for) agar worker tidak menunggu selamanya.
+    """
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise LLMUnavailable("Circuit breaker Gemini sedang terbuka")
+        try:
+            result = await asyncio.wait_for(call(), timeout=policy.timeout)
+        except TRANSIENT_ERRORS as e:
+            breaker.record_failure()
+            if attempt >= policy.retries:
+                raise LLMUnavailable(f"Panggilan Gemini gagal setelah {attempt + 1} percobaan: {e!r}") from e
+            delay = policy.delay(attempt)
+            print(f"LOG: Panggilan Gemini gagal ({e!r}), percobaan ulang dalam {delay:.2f} detik")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except Exception:
+            # Error permanen (mis. request tidak valid) tidak dicoba ulang dan tidak dihitung breaker
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+gemini_breaker = CircuitBreaker()
@@ -0,0 +1,62 @@
+# dashboard/management/commands/backfill_sale_prices.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+
+from dashboard.models import Product, Sale
+
+
+class Command(BaseCommand):
+    help = (
+        "Mengisi unit_price dan line_total pada Sale lama secara bertahap (per batch). "
+        "Aman dijalankan ulang: hanya baris yang belum terisi yang diproses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Jumlah baris Sale yang diperbarui per transaksi.')
+        parser.add_argument('--start-id', type=int, default=0,
+                            help='Lanjutkan dari ID Sale setelah nilai ini.')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Jeda (detik) antar batch untuk mengurangi beban database.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = options['start_id']
+        pause = options['sleep']
+
+        product_price = Subquery(
+            Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]
+        )
+        total_updated = 0
+
+        while True:
+            # Ambil ID batch berikutnya memakai kursor ID (bukan OFFSET), sehingga
+            # setiap batch hanya mengunci baris-barisnya sendiri.
+            batch_ids = list(
+                Sale.objects.filter(id__gt=last_id, unit_price__isnull=True)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+
+            with transaction.atomic():
+                updated = Sale.objects.filter(id__in=batch_ids, unit_price__isnull=True).update(
+                    unit_price=product_price,
+                    line_total=ExpressionWrapper(
+                        F('quantity') * product_price,
+                        output_field=DecimalField(max_digits=14, decimal_places=2),
+                    ),
+                )
+
+            total_updated += updated
+            last_id = batch_ids[-1]
+            self.stdout.write(f"Batch selesai sampai ID {last_id} ({total_updated} baris diperbarui).")
+
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill selesai: {total_updated} baris Sale diperbarui."))
@@ -0,0 +1,39 @@
+# dashboard/management/commands/evaluate_intent_router.py
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.intent_router import EVAL_SET_PATH, evaluate_router, intent_router, load_eval_set
+
+
+class Command(BaseCommand):
+    help = "Mengukur presisi, cakupan dan latensi intent router pada set prompt berlabel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(EVAL_SET_PATH),
+                            help='File JSON berisi [{"prompt": ..., "intent": ...}].')
+        parser.add_argument('--llm-round-trip', type=float, default=1.0,
+                            help='Perkiraan durasi satu panggilan Gemini (detik) untuk menghitung latensi yang dihemat.')
+
+    def handle(self, *args, **options):
+        try:
+            examples = load_eval_set(options['file'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Gagal membaca set evaluasi: {e}")
+
+        report = evaluate_router(intent_router, examples)
+        self.stdout.write(f"Contoh: {report['examples']}, di-route: {report['routed']}")
+        self.stdout.write(f"Presisi routing: {report['precision']:.1%}")
+        self.stdout.write(f"Cakupan pertanyaan data: {report['coverage']:.1%}")
+        for intent, counts in sorted(report['per_intent'].items()):
+            self.stdout.write(f"  {intent:<30} {counts['correct']}/{counts['routed']} benar")
+        for mistake in report['mistakes']:
+            self.stdout.write(self.style.WARNING(
+                f"  SALAH: '{mistake['prompt']}' -> {mistake['routed_to']} (seharusnya {mistake['expected']})"
+            ))
+
+        # Tanpa router, pertanyaan data butuh 2 panggilan Gemini (function call + jawaban akhir)
+        saved_per_prompt = 2 * options['llm_round_trip'] - report['avg_latency_ms'] / 1000
+        self.stdout.write(f"Latensi klasifikasi rata-rata: {report['avg_latency_ms']:.3f} ms per prompt")
+        self.stdout.write(self.style.SUCCESS(
+            f"Perkiraan latensi dihemat: {saved_per_prompt:.2f} detik per prompt yang di-route "
+            f"({saved_per_prompt * report['routed']:.1f} detik untuk set ini)."
+        ))
@@ -0,0 +1,35 @@
+# dashboard/management/commands/rebuild_sales_rollup.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company
+from dashboard.rollups import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Membangun ulang tabel DailySalesRollup dari data Sale untuk rentang tanggal tertentu."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat,
+                            help='Tanggal awal (YYYY-MM-DD). Kosongkan untuk seluruh riwayat.')
+        parser.add_argument('--end', type=date.fromisoformat,
+                            help='Tanggal akhir (YYYY-MM-DD), inklusif.')
+        parser.add_argument('--company', type=int,
+                            help='ID perusahaan. Kosongkan untuk semua perusahaan.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start and end and start > end:
+            raise CommandError("--start tidak boleh setelah --end.")
+
+        company = None
+        if options['company'] is not None:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Perusahaan dengan ID {options['company']} tidak ditemukan.")
+
+        created = rebuild_rollup(start, end, company=company, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rollup selesai dibangun ulang: {created} baris dibuat."))
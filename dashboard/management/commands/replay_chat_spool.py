@@ -0,0 +1,19 @@
+# dashboard/management/commands/replay_chat_spool.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from dashboard.chat_writer import replay_orphaned_spools
+
+
+class Command(BaseCommand):
+    help = ("Menulis ulang pesan chat dari file spool milik worker yang sudah berhenti ke database. "
+            "Aman dijalankan berulang kali; spool worker yang masih hidup dilewati (kecuali di Windows, "
+            "di mana perintah ini sebaiknya dijalankan saat semua worker mati).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spool-dir', default=str(settings.CHAT_SPOOL_DIR),
+                            help='Direktori spool (default: CHAT_SPOOL_DIR).')
+
+    def handle(self, *args, **options):
+        replayed = replay_orphaned_spools(options['spool_dir'])
+        self.stdout.write(self.style.SUCCESS(f"{replayed} pesan chat ditulis ulang dari spool."))
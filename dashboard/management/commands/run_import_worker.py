@@ -0,0 +1,41 @@
+# dashboard/management/commands/run_import_worker.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from dashboard.import_jobs import process_pending_jobs, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker yang memproses antrean ImportJob dari database. "
+        "Jalankan sebagai proses terpisah dari web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Proses semua job yang ada lalu berhenti.')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Jeda (detik) sebelum memeriksa antrean lagi saat kosong.')
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help="Menit sebelum job 'running' yang macet dikembalikan ke antrean.")
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options['stale_after'])
+        self.stdout.write("Import worker berjalan...")
+        try:
+            while True:
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(f"{requeued} job macet dikembalikan ke antrean.")
+
+                processed = process_pending_jobs()
+                if processed:
+                    self.stdout.write(f"{processed} job import selesai diproses.")
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Import worker dihentikan.")
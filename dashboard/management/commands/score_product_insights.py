@@ -0,0 +1,33 @@
+# dashboard/management/commands/score_product_insights.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company
+from dashboard.insights import score_product_insights
+
+
+class Command(BaseCommand):
+    help = ("Menghitung skor ProductInsight (kecepatan penjualan, perubahan mingguan, produk tanpa penjualan) "
+            "untuk semua produk dalam satu pass. Jalankan setiap malam, misalnya lewat cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Hari terakhir jendela 30 hari (YYYY-MM-DD). Default: hari ini.')
+        parser.add_argument('--company', type=int,
+                            help='ID perusahaan. Kosongkan untuk semua perusahaan.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company'] is not None:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Perusahaan dengan ID {options['company']} tidak ditemukan.")
+
+        start = time.perf_counter()
+        scored = score_product_insights(as_of=options['date'], company=company, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"{scored} produk dinilai dalam {elapsed:.2f} detik."))
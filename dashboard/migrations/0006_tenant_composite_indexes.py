@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+from dashboard.db_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY tidak boleh dijalankan di dalam transaksi
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('dashboard', '0005_dailysalesrollup'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='chathistory',
+            index=models.Index(fields=['company', '-created_at'], name='chat_company_created_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='dailysalesrollup',
+            index=models.Index(fields=['company', 'day'], name='rollup_company_day_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='product',
+            index=models.Index(fields=['company', '-price'], name='product_company_price_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='sale',
+            index=models.Index(fields=['company', 'sale_date'], name='sale_company_date_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.2 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+from dashboard.db_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY tidak boleh dijalankan di dalam transaksi
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('dashboard', '0007_importjob'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='product',
+            index=models.Index(fields=['company', 'created_at', 'id'], name='product_company_created_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='product',
+            index=models.Index(fields=['company', 'name', 'id'], name='product_company_name_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+from dashboard.db_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY tidak boleh dijalankan di dalam transaksi
+    atomic = False
+
+    dependencies = [
+        ('dashboard', '0010_chatsession'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='chathistory',
+            index=models.Index(fields=['session', '-created_at'], name='chat_session_created_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:20
+
+import uuid
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_message_ids(apps, schema_editor):
+    ChatHistory = apps.get_model('dashboard', 'ChatHistory')
+    batch = []
+    for chat in ChatHistory.objects.filter(message_id__isnull=True).only('id').iterator(chunk_size=1000):
+        chat.message_id = uuid.uuid4()
+        batch.append(chat)
+        if len(batch) == 1000:
+            ChatHistory.objects.bulk_update(batch, ['message_id'])
+            batch = []
+    if batch:
+        ChatHistory.objects.bulk_update(batch, ['message_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_chat_session_index'),
+    ]
+
+    operations = [
+        # Kolom dibuat nullable dulu lalu diisi per baris; default uuid4 di AddField
+        # akan memberi nilai yang sama ke semua baris lama dan melanggar unique.
+        migrations.AddField(
+            model_name='chathistory',
+            name='message_id',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_message_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='chathistory',
+            name='message_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='chathistory',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('dashboard', '0012_chathistory_message_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductInsight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('units_30d', models.PositiveBigIntegerField(default=0)),
+                ('revenue_30d', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('velocity', models.FloatField(default=0)),
+                ('units_this_week', models.PositiveBigIntegerField(default=0)),
+                ('units_last_week', models.PositiveBigIntegerField(default=0)),
+                ('wow_change', models.FloatField(blank=True, null=True)),
+                ('zero_sales', models.BooleanField(default=False)),
+                ('score', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='insight', to='dashboard.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', '-score'], name='insight_company_score_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from dashboard.db_operations import AddUniqueConstraintConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # Index unik dibangun dengan CREATE UNIQUE INDEX CONCURRENTLY (PostgreSQL),
+    # yang tidak boleh berjalan di dalam transaksi
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('dashboard', '0013_productinsight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='transaction_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        AddUniqueConstraintConcurrentlyIfPostgres(
+            model_name='sale',
+            constraint=models.UniqueConstraint(fields=('company', 'transaction_id'), name='sale_company_transaction_uniq'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 # dashboard/models.py
 
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.utils import timezone
 # Hapus 'from django.contrib.auth.models import User' jika tidak digunakan lagi di sini
 
 class Product(models.Model):
@@ -13,13 +16,51 @@ class Product(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.company.name})"
+
+    class Meta:
+        indexes = [
+            # Untuk Product.objects.filter(company=...).order_by('-price')
+            models.Index(fields=['company', '-price'], name='product_company_price_idx'),
+            # Untuk pagination cursor pada daftar produk
+            models.Index(fields=['company', 'created_at', 'id'], name='product_company_created_idx'),
+            models.Index(fields=['company', 'name', 'id'], name='product_company_name_idx'),
+        ]
     
     # === TAMBAHKAN MODEL BARU DI BAWAH INI ===
+class ChatSession(models.Model):
+    """
+    Satu percakapan chatbot. ChatHistory yang terhubung ke sesi ini menjadi
+    konteks percakapan, terpisah dari sesi lain milik perusahaan yang sama.
+    """
+    company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Diperbarui setiap ada pesan baru, untuk mengurutkan sesi dari yang terakhir aktif
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Session '{self.title or self.pk}' for {self.company.name}"
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            # Untuk daftar sesi per perusahaan (keyset pagination pada updated_at, id)
+            models.Index(fields=['company', '-updated_at', '-id'], name='session_company_updated_idx'),
+        ]
+
 class ChatHistory(models.Model):
     company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE, db_index=True)
+    # Kosong untuk riwayat lama sebelum ada sesi percakapan
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='messages', db_index=False)
+    # ID unik yang dibuat saat pesan diterima, agar penulisan ulang dari spool
+    # (lihat chat_writer) tidak menghasilkan baris ganda
+    message_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     prompt = models.TextField()
     response = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Bukan auto_now_add agar waktu saat pesan diterima tetap tersimpan walau ditulis belakangan
+    created_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"Chat for {self.company.name} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -28,12 +69,203 @@ class ChatHistory(models.Model):
         # Mengurutkan riwayat chat dari yang terbaru ke terlama
         ordering = ['-created_at']
         verbose_name_plural = "Chat Histories"
+        indexes = [
+            # Untuk riwayat chat terbaru per perusahaan
+            models.Index(fields=['company', '-created_at'], name='chat_company_created_idx'),
+            # Untuk riwayat satu sesi (konteks chatbot dan daftar pesan)
+            models.Index(fields=['session', '-created_at'], name='chat_session_created_idx'),
+        ]
+
+class ConversationSummary(models.Model):
+    """
+    Ringkasan bergulir percakapan lama satu sesi (atau riwayat tanpa sesi milik
+    satu perusahaan), dipakai sebagai konteks chatbot untuk giliran yang sudah
+    tidak muat di budget token. Diperbarui bertahap: hanya ChatHistory dengan
+    id > `last_chat_id` yang ditambahkan.
+    """
+    company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE, related_name='conversation_summaries')
+    session = models.OneToOneField(ChatSession, on_delete=models.CASCADE, null=True, blank=True, related_name='summary')
+    summary = models.TextField(blank=True)
+    last_chat_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Conversation summary for {self.company.name}"
+
+    class Meta:
+        constraints = [
+            # Satu ringkasan untuk riwayat tanpa sesi per perusahaan
+            models.UniqueConstraint(fields=['company'], condition=models.Q(session__isnull=True),
+                                    name='convsummary_company_no_session'),
+        ]
+
+class SaleQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Mengurangi rollup harian dengan satu agregasi lalu menghapus Sale.
+
+        Sengaja tidak memakai signal pre/post_delete pada Sale: receiver apa pun
+        membuat Django memuat dan menghapus Sale satu per satu saat cascade
+        (misalnya ketika produk dihapus). Cascade dari Product/Company tidak
+        melewati method ini, dan memang tidak perlu, karena baris rollup produk
+        atau perusahaan tersebut ikut terhapus.
+        """
+        from .cache import bump_data_version
+        from .rollups import remove_sales_from_rollup
+
+        with transaction.atomic():
+            company_ids = remove_sales_from_rollup(self)
+            result = super().delete()
+        for company_id in company_ids:
+            bump_data_version(company_id)
+        return result
+
 
 class Sale(models.Model):
     company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE, db_index=True)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
-    sale_date = models.DateTimeField(auto_now_add=True)
+    # Bisa diisi waktu transaksi dari mesin kasir (POS); default saat data dibuat.
+    sale_date = models.DateTimeField(default=timezone.now)
+    # ID transaksi dari sistem kasir, agar pengiriman ulang batch yang sama tidak tercatat dua kali.
+    transaction_id = models.CharField(max_length=64, null=True, blank=True)
+    # Snapshot harga saat transaksi terjadi, agar riwayat pendapatan tidak berubah
+    # ketika harga produk diubah dan agregasi tidak perlu JOIN ke tabel Product.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+
+    objects = SaleQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} for {self.company.name}"
+
+    def snapshot_price(self):
+        """
+        Mengisi unit_price (jika belum ada) dari harga produk saat ini dan
+        menghitung ulang line_total. Dipanggil otomatis oleh save(); kode yang
+        memakai bulk_create harus memanggilnya sendiri.
+        """
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        self.line_total = self.unit_price * self.quantity
+
+    def save(self, *args, **kwargs):
+        self.snapshot_price()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from .cache import bump_data_version
+        from .rollups import apply_sales_to_rollup
+
+        with transaction.atomic():
+            apply_sales_to_rollup([self], sign=-1)
+            result = super().delete(*args, **kwargs)
+        bump_data_version(self.company_id)
+        return result
+
+    class Meta:
+        indexes = [
+            # Untuk Sale.objects.filter(company=..., sale_date__gte=...)
+            models.Index(fields=['company', 'sale_date'], name='sale_company_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'transaction_id'], name='sale_company_transaction_uniq'),
+        ]
+
+class DailySalesRollup(models.Model):
+    """
+    Ringkasan penjualan harian per (perusahaan, produk, hari).
+    Diperbarui secara inkremental oleh signal Sale (lihat dashboard/signals.py)
+    dan bisa dibangun ulang dengan perintah `rebuild_sales_rollup`.
+    """
+    company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    day = models.DateField()
+    quantity = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.product.name}: {self.quantity} terjual"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'product', 'day'], name='dashboard_rollup_company_product_day'),
+        ]
+        indexes = [
+            # Untuk agregasi rentang hari per perusahaan (tren mingguan, saran proaktif)
+            models.Index(fields=['company', 'day'], name='rollup_company_day_idx'),
+        ]
+
+class ProductInsight(models.Model):
+    """
+    Skor per produk yang dihitung oleh perintah `score_product_insights` (batch
+    harian) dari DailySalesRollup 30 hari terakhir. Saran proaktif dibaca dari
+    tabel ini lewat index (company, -score), bukan dihitung ulang setiap request.
+    """
+    company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE, db_index=False)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='insight')
+    # Hari terakhir jendela 30 hari yang dipakai saat skor dihitung
+    as_of = models.DateField()
+    units_30d = models.PositiveBigIntegerField(default=0)
+    revenue_30d = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    # Rata-rata unit terjual per hari sejak produk terdaftar (maksimal 30 hari)
+    velocity = models.FloatField(default=0)
+    units_this_week = models.PositiveBigIntegerField(default=0)
+    units_last_week = models.PositiveBigIntegerField(default=0)
+    # Perubahan minggu ini dibanding minggu lalu dalam persen; kosong jika minggu lalu tidak ada penjualan
+    wow_change = models.FloatField(null=True, blank=True)
+    zero_sales = models.BooleanField(default=False)
+    # Semakin tinggi, semakin perlu perhatian (dipakai untuk memilih saran)
+    score = models.FloatField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Insight {self.product.name} ({self.as_of}): skor {self.score:.1f}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', '-score'], name='insight_company_score_idx'),
+        ]
+
+class ImportJob(models.Model):
+    """
+    Job import produk yang diproses di luar siklus request oleh worker
+    `run_import_worker`. Tabel ini sekaligus berfungsi sebagai antrean:
+    job berstatus 'pending' diambil berurutan berdasarkan waktu dibuat.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Menunggu'),
+        (STATUS_RUNNING, 'Diproses'),
+        (STATUS_DONE, 'Selesai'),
+        (STATUS_FAILED, 'Gagal'),
+    ]
+
+    company = models.ForeignKey('accounts.Company', on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=255)
+    # Isi file disimpan di database agar worker tidak butuh storage bersama;
+    # dikosongkan setelah job selesai.
+    payload = models.BinaryField(default=bytes)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import {self.file_name} ({self.get_status_display()}) for {self.company.name}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Untuk worker yang mengambil job 'pending' tertua
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx'),
+        ]
@@ -0,0 +1,91 @@
+# dashboard/pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(ordering, value, pk):
+    """Membuat cursor opaque dari posisi baris terakhir pada halaman."""
+    if isinstance(value, datetime):
+        value = value.isoformat()  # isoformat mempertahankan mikrodetik
+    elif value is not None and not isinstance(value, (str, int)):
+        value = str(value)  # Decimal, dll.
+    raw = json.dumps({'o': ordering, 'v': value, 'id': pk}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Membaca cursor; melempar ValueError jika rusak atau dibuat untuk urutan lain."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, pk = data['v'], int(data['id'])
+        cursor_ordering = data['o']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Parameter 'cursor' tidak valid.")
+    if cursor_ordering != ordering:
+        raise ValueError("Parameter 'cursor' tidak cocok dengan 'ordering'.")
+    return value, pk
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    raw = request.query_params.get('limit')
+    if raw is None:
+        return default
+    try:
+        size = int(raw)
+    except ValueError:
+        raise ValueError("Parameter 'limit' harus berupa angka.")
+    if size < 1:
+        raise ValueError("Parameter 'limit' minimal 1.")
+    return min(size, maximum)
+
+
+def paginate_keyset(queryset, request, ordering, page_size=None):
+    """
+    Pagination keyset (cursor) pada pasangan (field urutan, id).
+    `ordering` adalah nama field dengan awalan '-' opsional untuk urutan menurun.
+
+    Berbeda dengan OFFSET, setiap halaman dibaca langsung dari posisi cursor di index,
+    sehingga waktu respons tetap sama di halaman pertama maupun ke-1000.
+    Mengembalikan (daftar_objek, url_halaman_berikutnya_atau_None).
+    """
+    if page_size is None:
+        page_size = get_page_size(request)
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        value, pk = decode_cursor(cursor, ordering)
+        if descending:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}))
+
+    id_ordering = '-id' if descending else 'id'
+    rows = list(queryset.order_by(ordering, id_ordering)[:page_size + 1])
+
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):  # queryset .values()
+            value, pk = last[field], last['id']
+        else:
+            value, pk = getattr(last, field), last.pk
+        params = request.query_params.copy()
+        params['cursor'] = encode_cursor(ordering, value, pk)
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return rows, next_url
+
+
+def next_page_headers(next_url):
+    """Header Link (RFC 8288) agar body respons tetap berupa list seperti sebelumnya."""
+    return {'Link': f'<{next_url}>; rel="next"'} if next_url else {}
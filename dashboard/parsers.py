@@ -0,0 +1,17 @@
+# dashboard/parsers.py
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser untuk body NDJSON (satu objek JSON per baris). Body tidak dibaca
+    sekaligus: `request.data` berupa generator baris mentah (bytes) yang dibaca
+    dari stream saat diiterasi, dan setiap baris di-decode oleh pemakainya agar
+    satu baris rusak hanya menggagalkan baris itu.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return (line for line in (raw.strip() for raw in stream) if line)
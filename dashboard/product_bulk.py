@@ -0,0 +1,127 @@
+# dashboard/product_bulk.py
+"""
+Operasi produk massal (create, update, delete) untuk sinkronisasi katalog.
+Semua operasi dalam satu request divalidasi dulu, lalu yang valid disimpan
+dalam satu transaksi dengan bulk_create, bulk_update (per UPDATE_BATCH_SIZE
+produk) dan satu penghapusan queryset. Penghapusan produk ikut menghapus
+Sale, DailySalesRollup dan ProductInsight-nya dengan satu DELETE per tabel
+(fast delete, lihat SaleQuerySet). Jumlah query hanya bertambah per
+UPDATE_BATCH_SIZE update, tidak per operasi atau per penjualan produk yang dihapus,
+dan versi cache perusahaan dinaikkan sekali per request, bukan sekali per produk.
+"""
+from django.db import transaction
+
+from .cache import bulk_invalidation, bump_data_version
+from .importers import parse_product_row
+from .models import Product
+
+OPERATIONS = ('create', 'update', 'delete')
+# bulk_update membangun satu ekspresi CASE WHEN per batch; batch besar membuat query sangat panjang
+UPDATE_BATCH_SIZE = 1000
+
+
+def _product_id(operation):
+    product_id = operation.get('id')
+    if isinstance(product_id, bool) or not isinstance(product_id, int):
+        raise ValueError("id produk harus berupa bilangan bulat")
+    return product_id
+
+
+def apply_product_operations(company, operations):
+    """
+    Menjalankan daftar operasi produk untuk satu perusahaan:
+
+    - {"op": "create", "name": ..., "price": ...}
+    - {"op": "update", "id": ..., "name": ... (opsional), "price": ... (opsional)}
+    - {"op": "delete", "id": ...}
+
+    Produk untuk update/delete dicari dengan satu query `id IN (...)` yang dibatasi
+    ke perusahaan ini; id milik perusahaan lain dilaporkan sebagai tidak ditemukan.
+    Operasi yang tidak valid dilaporkan tanpa menggagalkan operasi lain.
+    Mengembalikan list hasil per operasi, urut sesuai input.
+    """
+    results = [None] * len(operations)
+
+    def fail(index, op, message):
+        results[index] = {'index': index, 'op': op, 'status': 'error', 'error': message}
+
+    # Tahap 1: validasi bentuk setiap operasi dan kumpulkan id yang dirujuk
+    pending = []
+    referenced_ids = set()
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in OPERATIONS:
+            fail(index, op, f"op harus salah satu dari: {', '.join(OPERATIONS)}")
+            continue
+        try:
+            product_id = None if op == 'create' else _product_id(operation)
+        except ValueError as e:
+            fail(index, op, str(e))
+            continue
+        if product_id is not None:
+            referenced_ids.add(product_id)
+        pending.append((index, op, product_id, operation))
+
+    with transaction.atomic():
+        existing = {
+            product.pk: product
+            for product in Product.objects.filter(company=company, pk__in=referenced_ids)
+            .only('id', 'name', 'price').select_for_update()
+        }
+
+        # Tahap 2: validasi isi terhadap data yang ada
+        to_create, to_update, to_delete = [], [], []
+        touched = set()
+        for index, op, product_id, operation in pending:
+            if product_id is not None:
+                if product_id not in existing:
+                    fail(index, op, f"Produk dengan id {product_id} tidak ditemukan")
+                    continue
+                if product_id in touched:
+                    fail(index, op, f"Produk dengan id {product_id} muncul lebih dari sekali dalam batch")
+                    continue
+                touched.add(product_id)
+
+            if op == 'delete':
+                to_delete.append((index, product_id))
+                continue
+
+            current = existing.get(product_id)
+            try:
+                name, price = parse_product_row(
+                    operation.get('name', current.name if current else None),
+                    operation.get('price', current.price if current else None),
+                )
+            except ValueError as e:
+                fail(index, op, str(e))
+                continue
+            if op == 'create':
+                to_create.append((index, Product(company=company, name=name, price=price)))
+            else:
+                current.name, current.price = name, price
+                to_update.append((index, current))
+
+        # Tahap 3: simpan semuanya sekaligus
+        if to_create:
+            Product.objects.bulk_create([product for _, product in to_create])
+        if to_update:
+            Product.objects.bulk_update(
+                [product for _, product in to_update], fields=['name', 'price'], batch_size=UPDATE_BATCH_SIZE,
+            )
+        if to_delete:
+            # Tanpa bulk_invalidation, signal post_delete menaikkan versi cache sekali per produk
+            with bulk_invalidation():
+                Product.objects.filter(company=company, pk__in=[pk for _, pk in to_delete]).delete()
+        if to_create or to_update or to_delete:
+            # bulk_create dan bulk_update tidak memicu signal, jadi invalidasi cache dilakukan sekali di sini
+            bump_data_version(company.id)
+
+    for index, product in to_create:
+        results[index] = {'index': index, 'op': 'create', 'status': 'created', 'id': product.pk}
+    for index, product in to_update:
+        results[index] = {'index': index, 'op': 'update', 'status': 'updated', 'id': product.pk}
+    for index, product_id in to_delete:
+        results[index] = {'index': index, 'op': 'delete', 'status': 'deleted', 'id': product_id}
+    print(f"LOG: Operasi produk massal {company.name}: {len(to_create)} dibuat, {len(to_update)} diperbarui, "
+          f"{len(to_delete)} dihapus, {sum(result['status'] == 'error' for result in results)} gagal")
+    return results
@@ -0,0 +1,115 @@
+# dashboard/prompt_cache.py
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import get_data_version
+
+
+def normalize_prompt(prompt):
+    """Huruf kecil, tanpa tanda baca, spasi dirapikan: "Berapa produk saya??" -> "berapa produk saya"."""
+    text = unicodedata.normalize('NFKC', prompt).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+# Partikel obrolan yang tidak mengubah maksud pertanyaan ("berapa produk saya ya?")
+FILLER_WORDS = frozenset({'ya', 'yah', 'dong', 'sih', 'deh', 'nih', 'kak', 'tolong', 'please', 'pls'})
+
+
+def cache_key(prompt):
+    """Prompt dinormalisasi tanpa partikel obrolan; hanya prompt dengan kunci identik yang berbagi jawaban."""
+    return ' '.join(word for word in normalize_prompt(prompt).split() if word not in FILLER_WORDS)
+
+
+# Kata/frasa yang merujuk ke giliran sebelumnya ("bagaimana dengan itu?", "jelaskan lagi").
+# Jawaban prompt seperti ini bergantung pada riwayat percakapan.
+REFERENCE_PATTERN = re.compile(
+    r'\b(itu|tersebut|tadi|barusan|sebelumnya|lagi|juga|lainnya|lanjut\w*|dia|mereka|dengan yang'
+    r'|it|its|that|those|them|previous|above|again|also|else)\b'
+    r'|^(dan|terus|trus|lalu|kalau|kalo|gimana|bagaimana dengan|and|then|what about|how about)\b'
+)
+
+
+def is_self_contained(prompt):
+    """
+    True jika prompt bisa dijawab tanpa riwayat percakapan ("berapa produk saya"),
+    sehingga jawabannya boleh dipakai ulang walau percakapan sudah punya riwayat.
+    """
+    return REFERENCE_PATTERN.search(normalize_prompt(prompt)) is None
+
+
+class PromptCache:
+    """
+    Cache jawaban chatbot per perusahaan di memori proses, dengan eviksi LRU.
+
+    Entri berlaku untuk satu versi data perusahaan (lihat cache.get_data_version)
+    dan satu tanggal lokal, sehingga perubahan Product/Sale otomatis membuat
+    jawaban lama tidak terpakai. Pencarian hanya exact match pada cache_key():
+    prompt yang berbeda satu kata ("minggu ini" vs "minggu lalu", "50000" vs
+    "15000") bisa punya jawaban yang berbeda, jadi tidak ada pencocokan mirip.
+
+    Kunci juga memuat sidik konteks `context` dari pemanggil: '' untuk prompt
+    yang tidak bergantung riwayat (lihat is_self_contained) atau percakapan tanpa
+    riwayat, dan hash riwayat (context_builder.context_fingerprint) untuk prompt
+    lanjutan, sehingga jawaban lanjutan hanya dipakai ulang untuk riwayat yang sama.
+    Tidak aktif jika TENANT_CACHE_ENABLED False (versi data tidak dibagi antar worker).
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.CHATBOT_PROMPT_CACHE_SIZE
+        self._lock = threading.Lock()
+        # (company_id, context, cache_key) -> (versi, jawaban), urutan = LRU
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    @property
+    def hit_rate(self):
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+
+    def _version(self, company_id):
+        return f"{get_data_version(company_id)}:{timezone.localdate().isoformat()}"
+
+    def get(self, company_id, prompt, context=''):
+        """Mengembalikan jawaban yang tersimpan untuk prompt dan konteks ini, atau None."""
+        if not settings.TENANT_CACHE_ENABLED:
+            return None
+        key = (company_id, context, cache_key(prompt))
+        version = self._version(company_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                # Entri dari versi data lama tidak akan pernah terpakai lagi
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, company_id, prompt, response, context=''):
+        if not settings.TENANT_CACHE_ENABLED:
+            return
+        key = (company_id, context, cache_key(prompt))
+        version = self._version(company_id)
+        with self._lock:
+            self._entries[key] = (version, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+
+prompt_cache = PromptCache()
@@ -0,0 +1,22 @@
+# dashboard/renderers.py
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renderer JSON berbasis orjson, jauh lebih cepat dari json bawaan Python
+    untuk list besar. Tipe yang tidak dikenal orjson (Decimal, lazy string, dll.)
+    diserahkan ke encoder DRF agar hasilnya sama dengan JSONRenderer.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    _fallback_encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self._fallback_encoder.default)
@@ -0,0 +1,130 @@
+# dashboard/rollups.py
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from accounts.models import Company
+from .cache import bump_data_version
+from .models import DailySalesRollup, Sale
+
+
+def _apply_deltas(deltas):
+    """
+    Menambahkan selisih {(perusahaan, produk, hari): [quantity, revenue]} ke
+    DailySalesRollup, satu UPDATE per kelompok. Pengurangan dibatasi di 0
+    (Greatest) agar rollup yang sempat tidak konsisten tidak melanggar
+    constraint kolom positif; baris yang habis dihapus.
+    """
+    with transaction.atomic():
+        for (company_id, product_id, day), (quantity, revenue) in deltas.items():
+            rows = DailySalesRollup.objects.filter(company_id=company_id, product_id=product_id, day=day)
+            if quantity < 0 or revenue < 0:
+                rows.update(
+                    quantity=Greatest(F('quantity') + quantity, Value(0)),
+                    revenue=Greatest(F('revenue') + revenue, Value(Decimal('0'))),
+                )
+                rows.filter(quantity__lte=0).delete()
+                continue
+            updated = rows.update(quantity=F('quantity') + quantity, revenue=F('revenue') + revenue)
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    DailySalesRollup.objects.create(
+                        company_id=company_id, product_id=product_id, day=day,
+                        quantity=quantity, revenue=revenue,
+                    )
+            except IntegrityError:
+                # Baris yang sama baru saja dibuat oleh proses lain, tambahkan saja.
+                rows.update(quantity=F('quantity') + quantity, revenue=F('revenue') + revenue)
+
+
+def apply_sales_to_rollup(sales, sign=1):
+    """
+    Menambahkan (sign=1) atau mengurangi (sign=-1) kontribusi sekumpulan Sale
+    ke tabel DailySalesRollup. Penjualan dikelompokkan dulu per
+    (perusahaan, produk, hari) sehingga jumlah query sebanding dengan jumlah
+    kelompok, bukan jumlah baris Sale.
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for sale in sales:
+        key = (sale.company_id, sale.product_id, timezone.localdate(sale.sale_date))
+        deltas[key][0] += sale.quantity * sign
+        deltas[key][1] += (sale.line_total or Decimal('0')) * sign
+    _apply_deltas(deltas)
+
+
+def remove_sales_from_rollup(sales):
+    """
+    Mengurangi kontribusi queryset Sale dari rollup sebelum dihapus. Kelompok
+    (perusahaan, produk, hari) dihitung dengan satu agregasi di database, jadi
+    baris Sale tidak perlu dimuat satu per satu. Mengembalikan id perusahaan
+    yang terdampak.
+    """
+    totals = (
+        sales.annotate(day=TruncDate('sale_date'))
+        .values('company_id', 'product_id', 'day')
+        .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('line_total'))
+        .order_by()
+    )
+    deltas = {
+        (row['company_id'], row['product_id'], row['day']):
+            [-row['total_quantity'], -(row['total_revenue'] or Decimal('0'))]
+        for row in totals
+    }
+    _apply_deltas(deltas)
+    return {company_id for company_id, _, _ in deltas}
+
+
+def rebuild_rollup(start_day=None, end_day=None, company=None, batch_size=1000):
+    """
+    Menghitung ulang DailySalesRollup dari tabel Sale untuk rentang hari
+    [start_day, end_day] (inklusif). Mengembalikan jumlah baris rollup yang dibuat.
+    """
+    sales = Sale.objects.all()
+    rollups = DailySalesRollup.objects.all()
+    if company is not None:
+        sales = sales.filter(company=company)
+        rollups = rollups.filter(company=company)
+    if start_day is not None:
+        sales = sales.filter(sale_date__date__gte=start_day)
+        rollups = rollups.filter(day__gte=start_day)
+    if end_day is not None:
+        sales = sales.filter(sale_date__date__lte=end_day)
+        rollups = rollups.filter(day__lte=end_day)
+
+    aggregated = (
+        sales.annotate(day=TruncDate('sale_date'))
+        .values('company_id', 'product_id', 'day')
+        .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('line_total'))
+        .order_by()
+    )
+
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in aggregated.iterator(chunk_size=batch_size):
+            batch.append(DailySalesRollup(
+                company_id=row['company_id'],
+                product_id=row['product_id'],
+                day=row['day'],
+                quantity=row['total_quantity'],
+                revenue=row['total_revenue'] or Decimal('0'),
+            ))
+            if len(batch) >= batch_size:
+                DailySalesRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailySalesRollup.objects.bulk_create(batch)
+            created += len(batch)
+
+        company_ids = [company.id] if company is not None else Company.objects.values_list('id', flat=True)
+        for company_id in company_ids:
+            bump_data_version(company_id)
+    return created
@@ -0,0 +1,188 @@
+# dashboard/sales_ingest.py
+"""
+Penyimpanan penjualan massal dari mesin kasir (POS). Item diproses per batch
+(SALES_INGEST_BATCH_SIZE): validasi, satu lookup produk milik perusahaan, satu
+lookup transaction_id yang sudah tercatat, lalu bulk_create dan pembaruan
+rollup harian dalam satu transaksi.
+
+Setiap item wajib membawa `transaction_id` dari POS. Item yang transaction_id-nya
+sudah tercatat dilewati (dilaporkan sebagai duplikat), sehingga batch yang gagal
+di tengah jalan aman dikirim ulang utuh.
+"""
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import Company
+from .cache import bump_data_version
+from .models import Product, Sale
+from .rollups import apply_sales_to_rollup
+
+MAX_UNIT_PRICE = Decimal('99999999.99')  # Batas Sale.unit_price (max_digits=10, decimal_places=2)
+# Batas jumlah per item; MAX_UNIT_PRICE * MAX_QUANTITY masih muat di Sale.line_total (max_digits=14)
+MAX_QUANTITY = 10_000
+MAX_REPORTED_ERRORS = 100
+TRANSACTION_ID_MAX_LENGTH = Sale._meta.get_field('transaction_id').max_length
+
+
+def parse_sale_item(item):
+    """
+    Memvalidasi satu item penjualan dan mengembalikan dict yang sudah bersih
+    (transaction_id, product_id, quantity, sale_date, unit_price). Item boleh
+    berupa dict atau satu baris JSON (bytes/str). Melempar ValueError dengan
+    pesan yang bisa ditampilkan ke pengguna.
+    """
+    if isinstance(item, (bytes, str)):
+        try:
+            item = orjson.loads(item)
+        except orjson.JSONDecodeError:
+            raise ValueError("Baris bukan JSON yang valid")
+    if not isinstance(item, dict):
+        raise ValueError("Item harus berupa objek JSON")
+
+    transaction_id = item.get('transaction_id')
+    transaction_id = str(transaction_id).strip() if transaction_id is not None else ''
+    if not transaction_id:
+        raise ValueError("transaction_id wajib diisi")
+    if len(transaction_id) > TRANSACTION_ID_MAX_LENGTH:
+        raise ValueError(f"transaction_id terlalu panjang (maksimal {TRANSACTION_ID_MAX_LENGTH} karakter)")
+
+    product_id = item.get('product_id')
+    if isinstance(product_id, bool) or not isinstance(product_id, int):
+        raise ValueError("product_id harus berupa bilangan bulat")
+
+    quantity = item.get('quantity', 1)
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or not 1 <= quantity <= MAX_QUANTITY:
+        raise ValueError(f"quantity harus bilangan bulat antara 1 dan {MAX_QUANTITY}")
+
+    sale_date = item.get('sale_date')
+    if sale_date is not None:
+        try:
+            sale_date = parse_datetime(str(sale_date))
+        except ValueError:
+            sale_date = None
+        if sale_date is None:
+            raise ValueError("sale_date harus berformat ISO 8601, contoh 2026-10-18T09:30:00+07:00")
+        if timezone.is_naive(sale_date):
+            sale_date = timezone.make_aware(sale_date)
+
+    unit_price = item.get('unit_price')
+    if unit_price is not None:
+        try:
+            unit_price = Decimal(str(unit_price))
+        except InvalidOperation:
+            raise ValueError(f"unit_price '{unit_price}' bukan angka yang valid")
+        if not unit_price.is_finite() or unit_price < 0 or unit_price > MAX_UNIT_PRICE:
+            raise ValueError("unit_price harus antara 0 dan 99.999.999,99")
+        unit_price = unit_price.quantize(Decimal('0.01'))
+
+    return {
+        'transaction_id': transaction_id,
+        'product_id': product_id,
+        'quantity': quantity,
+        'sale_date': sale_date,
+        'unit_price': unit_price,
+    }
+
+
+class IngestReport:
+    """Ringkasan hasil satu request: jumlah item tercatat, duplikat, dan yang ditolak."""
+
+    def __init__(self):
+        self.created = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, index, transaction_id, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'index': index, 'transaction_id': transaction_id, 'error': message})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'errors': sorted(self.errors, key=lambda error: error['index']),
+        }
+
+
+def _ingest_batch(company, batch, report):
+    """Menyimpan satu batch [(index, item mentah)] untuk satu perusahaan."""
+    parsed = []
+    for index, raw in batch:
+        try:
+            parsed.append((index, parse_sale_item(raw)))
+        except ValueError as e:
+            transaction_id = raw.get('transaction_id') if isinstance(raw, dict) else None
+            report.reject(index, transaction_id, str(e))
+    if not parsed:
+        return
+
+    with transaction.atomic():
+        # Mengunci baris perusahaan agar request bersamaan (misalnya retry dari POS)
+        # tidak lolos pemeriksaan duplikat bersama-sama.
+        Company.objects.select_for_update().filter(pk=company.pk).exists()
+        prices = dict(
+            Product.objects.filter(company=company, pk__in={item['product_id'] for _, item in parsed})
+            .values_list('pk', 'price')
+        )
+        recorded = set(
+            Sale.objects.filter(company=company, transaction_id__in={item['transaction_id'] for _, item in parsed})
+            .values_list('transaction_id', flat=True)
+        )
+
+        sales = []
+        for index, item in parsed:
+            if item['transaction_id'] in recorded:
+                report.duplicates += 1
+                continue
+            price = prices.get(item['product_id'])
+            if price is None:
+                report.reject(index, item['transaction_id'], f"Produk dengan id {item['product_id']} tidak ditemukan")
+                continue
+            recorded.add(item['transaction_id'])
+            sale = Sale(
+                company=company,
+                product_id=item['product_id'],
+                quantity=item['quantity'],
+                transaction_id=item['transaction_id'],
+                unit_price=item['unit_price'] if item['unit_price'] is not None else price,
+            )
+            if item['sale_date'] is not None:
+                sale.sale_date = item['sale_date']
+            sale.snapshot_price()
+            sales.append(sale)
+
+        if sales:
+            # bulk_create tidak memicu signal Sale: rollup dan versi cache diperbarui di sini
+            Sale.objects.bulk_create(sales)
+            apply_sales_to_rollup(sales, sign=1)
+            bump_data_version(company.id)
+            report.created += len(sales)
+
+
+def ingest_sales(company, items, batch_size=None):
+    """
+    Mencatat penjualan dari iterable item (list dari body JSON atau generator
+    baris NDJSON) untuk satu perusahaan. Item dibaca dan disimpan per batch,
+    jadi memori tetap sebesar satu batch berapa pun panjang body-nya.
+    Mengembalikan IngestReport.
+    """
+    batch_size = batch_size or settings.SALES_INGEST_BATCH_SIZE
+    report = IngestReport()
+    numbered = enumerate(items)
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        _ingest_batch(company, batch, report)
+    print(f"LOG: Penjualan massal {company.name}: {report.created} tercatat, "
+          f"{report.duplicates} duplikat, {report.rejected} ditolak")
+    return report
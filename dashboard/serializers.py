@@ -1,6 +1,6 @@
 # dashboard/serializers.py
 from rest_framework import serializers
-from .models import Product, ChatHistory
+from .models import Product, ChatHistory, ChatSession, ImportJob
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,3 +14,18 @@ class ChatHistorySerializer(serializers.ModelSerializer):
         model = ChatHistory
         # Tentukan field yang ingin kita tampilkan di API
         fields = ['id', 'prompt', 'response', 'created_at']
+
+
+class ChatSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatSession
+        fields = ['id', 'title', 'created_at', 'updated_at']
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'file_name', 'status', 'total_rows', 'created_count', 'updated_count',
+            'error_count', 'errors', 'message', 'created_at', 'started_at', 'finished_at',
+        ]
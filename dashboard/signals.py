@@ -0,0 +1,29 @@
+# dashboard/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_data_version, in_bulk_invalidation
+from .models import Product, Sale
+from .rollups import apply_sales_to_rollup
+
+
+@receiver(post_save, sender=Sale)
+def add_sale_to_rollup(sender, instance, created, **kwargs):
+    # Hanya penjualan baru yang ditambahkan; koreksi data lama dilakukan lewat rebuild_sales_rollup.
+    if created:
+        apply_sales_to_rollup([instance], sign=1)
+
+
+# Penghapusan Sale ditangani di Sale.delete() dan SaleQuerySet.delete(), bukan
+# lewat signal: receiver pre/post_delete pada Sale mematikan fast delete Django,
+# sehingga menghapus satu produk akan memuat dan menghapus setiap Sale-nya satu per satu.
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver(post_save, sender=Sale)
+def invalidate_company_cache(sender, instance, **kwargs):
+    # Hasil analitik yang di-cache untuk perusahaan ini tidak berlaku lagi.
+    # Operasi massal menaikkan versi sekali sendiri (lihat cache.bulk_invalidation).
+    if in_bulk_invalidation():
+        return
+    bump_data_version(instance.company_id)
@@ -6,14 +6,31 @@ urlpatterns = [
     # URL untuk daftar produk (GET, POST)
     path('', views.product_list_api, name='product-list-api'),
 
+    # URL untuk create/update/delete banyak produk sekaligus
+    path('bulk/', views.product_bulk_api, name='product-bulk-api'),
+
     # URL BARU untuk satu produk spesifik (GET, PUT, DELETE)
     path('<int:pk>/', views.product_detail_api, name='product-detail-api'),
        # URL BARU untuk chatbot
     path('chatbot/', views.chatbot_api, name='chatbot-api'),
+    # URL untuk chatbot async (dijalankan lewat ASGI/uvicorn)
+    path('chatbot/async/', views.chatbot_async_api, name='chatbot-async-api'),
+    # URL untuk chatbot streaming (Server-Sent Events)
+    path('chatbot/stream/', views.chatbot_stream_api, name='chatbot-stream-api'),
     # URL BARU untuk Riwayat Chat
     path('chat-history/', views.chat_history_api, name='chat-history-api'),
+    # URL untuk ekspor data perusahaan, contoh: exports/products.csv, exports/sales.xlsx
+    path('exports/<slug:dataset>.<slug:file_format>', views.export_api, name='export-api'),
+    # URL untuk sesi percakapan dan pesan di dalamnya
+    path('chat-sessions/', views.chat_session_list_api, name='chat-session-list-api'),
+    path('chat-sessions/<int:pk>/messages/', views.chat_session_messages_api, name='chat-session-messages-api'),
     # URL BARU untuk halaman upload
     path('upload-products/', views.upload_products_view, name='upload-products'),
+    # URL untuk memantau progres job import produk
+    path('import-jobs/<int:pk>/', views.import_job_detail_api, name='import-job-detail-api'),
     path('performance-summary/', views.performance_summary_api, name='performance-summary-api'),
+    # URL untuk pencatatan penjualan massal dari mesin kasir (JSON array atau NDJSON)
+    path('sales/bulk/', views.sales_bulk_api, name='sales-bulk-api'),
+    path('sales-analytics/', views.sales_analytics_api, name='sales-analytics-api'),
     path('proactive-suggestion/', views.proactive_suggestion_api, name='proactive-suggestion-api'),
 ]
\ No newline at end of file
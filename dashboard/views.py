@@ -1,33 +1,96 @@
 # dashboard/views.py
 
+import asyncio
+import json
+import orjson
+from collections import Counter
 from datetime import timezone
+from decimal import Decimal, InvalidOperation
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required # <-- 1. Import decorator login_required
+from django.views.decorators.csrf import csrf_exempt
 from .chatbot_tools import CompanyAwareTools
 from django.utils import timezone
 
 # Imports untuk DRF
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes # <-- 2. Import permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes # <-- 2. Import permission_classes
 from rest_framework.permissions import IsAuthenticated # <-- 3. Import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 
 from dashboard.chatbot_tools import CompanyAwareTools
 
 # Imports untuk aplikasi ini
-from .models import Product, ChatHistory
-from .serializers import ProductSerializer, ChatHistorySerializer
-from .chatbot_service import run_chatbot_conversation
+from .models import Product, ChatHistory, ChatSession, ImportJob
+from .serializers import ProductSerializer, ChatHistorySerializer, ChatSessionSerializer, ImportJobSerializer
+from .chatbot_service import run_chatbot_conversation, run_chatbot_conversation_async, stream_chatbot_conversation
 from .forms import UploadFileForm
-import pandas as pd
+from .import_jobs import enqueue_import
+from .chat_writer import get_chat_writer
+from .llm_limiter import ChatbotOverloaded
+from .pagination import next_page_headers, paginate_keyset
+from .fast_serializers import ValuesRowSerializer
+from .renderers import ORJSONRenderer
+from .analytics import build_sales_report, load_sales_history
+from .parsers import NDJSONParser
+from .sales_ingest import ingest_sales
+from .product_bulk import apply_product_operations
+from .exports import EXPORT_DATASETS, EXPORT_FORMATS
 
 
 
 # === API Views (Sekarang Aman) ===
 
+PRODUCT_ORDERINGS = ('created_at', '-created_at', 'name', '-name', 'price', '-price')
+ANALYTICS_MAX_DAYS = 365
+
+
+def filter_products(products, params):
+    """
+    Menerapkan parameter query daftar produk:
+    `search` (nama mengandung teks), `min_price`, `max_price`,
+    `ordering` (salah satu PRODUCT_ORDERINGS) dan `fields` (daftar field dipisah koma).
+    Mengembalikan (queryset, fields, ordering). Melempar ValueError untuk parameter tidak valid.
+    """
+    search = params.get('search')
+    if search:
+        products = products.filter(name__icontains=search)
+
+    for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+        if params.get(param):
+            try:
+                products = products.filter(**{lookup: Decimal(params[param])})
+            except InvalidOperation:
+                raise ValueError(f"Parameter '{param}' harus berupa angka.")
+
+    ordering = params.get('ordering', 'created_at')
+    if ordering not in PRODUCT_ORDERINGS:
+        raise ValueError(f"Parameter 'ordering' harus salah satu dari: {', '.join(PRODUCT_ORDERINGS)}.")
+
+    fields = None
+    if params.get('fields'):
+        fields = [f.strip() for f in params['fields'].split(',') if f.strip()]
+        unknown = set(fields) - set(ProductSerializer.Meta.fields)
+        if unknown:
+            raise ValueError(f"Field tidak dikenal: {', '.join(sorted(unknown))}.")
+
+    return products, fields, ordering
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated]) # <-- 4. Terapkan aturan: hanya user terautentikasi yang bisa akses
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
 def product_list_api(request):
     """
     API untuk mendapatkan daftar produk MILIK PERUSAHAAN user atau membuat produk baru.
@@ -38,8 +101,16 @@ def product_list_api(request):
     if request.method == 'GET':
         # 5. FILTER data: hanya ambil produk milik perusahaan ini
         products = Product.objects.filter(company=user_company)
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        try:
+            products, fields, ordering = filter_products(products, request.query_params)
+            fields = fields or ProductSerializer.Meta.fields
+            # Jalur baca cepat: ambil kolom via .values() tanpa membuat objek model
+            rows = products.values(*set(fields) | {'id', ordering.lstrip('-')})
+            page, next_url = paginate_keyset(rows, request, ordering)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = ValuesRowSerializer(ProductSerializer, fields).serialize(page)
+        return Response(data, headers=next_page_headers(next_url))
 
     elif request.method == 'POST':
         serializer = ProductSerializer(data=request.data)
@@ -50,6 +121,36 @@ def product_list_api(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
+def product_bulk_api(request):
+    """
+    API untuk membuat, mengubah, dan menghapus banyak produk MILIK PERUSAHAAN user
+    dalam satu request. Body berupa array operasi, misalnya
+    [{"op": "create", "name": "Kopi", "price": 18000}, {"op": "update", "id": 5, "price": 20000},
+    {"op": "delete", "id": 7}]. Hasil dikembalikan per operasi, urut sesuai input.
+    """
+    operations = request.data
+    if not isinstance(operations, list):
+        return Response({"error": "Body harus berupa array operasi produk."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > settings.PRODUCT_BULK_MAX_OPERATIONS:
+        return Response(
+            {"error": f"Maksimal {settings.PRODUCT_BULK_MAX_OPERATIONS} operasi per request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    results = apply_product_operations(request.user.company, operations)
+    counts = Counter(result['status'] for result in results)
+    return Response({
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'deleted': counts['deleted'],
+        'failed': counts['error'],
+        'results': results,
+    })
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated]) # <-- Terapkan aturan keamanan di sini juga
 def product_detail_api(request, pk):
@@ -87,9 +188,11 @@ def chatbot_api(request):
     API endpoint untuk chatbot AI yang aman dan menyimpan riwayat.
     """
     user_prompt = ""
+    session_id = None
     
     if isinstance(request.data, dict):
         user_prompt = request.data.get('prompt', '')
+        session_id = request.data.get('session_id')
     elif isinstance(request.data, str):
         user_prompt = request.data
     
@@ -103,41 +206,197 @@ def chatbot_api(request):
 
     # 1. Ambil perusahaan dari user yang sedang login
     user_company = request.user.company
+    try:
+        session = get_chat_session(user_company, session_id)
+    except ChatSession.DoesNotExist:
+        return Response({"error": SESSION_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
 
     # 2. PERBAIKAN UTAMA: Kirim 'company' sebagai argumen
-    chatbot_response = run_chatbot_conversation(user_prompt=user_prompt, company=user_company)
+    try:
+        chatbot_response = run_chatbot_conversation(user_prompt=user_prompt, company=user_company, session=session)
+    except ChatbotOverloaded as e:
+        return Response(chatbot_busy_reply(e), status=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers={'Retry-After': str(e.retry_after)})
 
     # 3. Simpan percakapan ke database
-    ChatHistory.objects.create(
-        company=user_company,
-        prompt=user_prompt,
-        response=chatbot_response
-    )
+    save_chat_turn(user_company, session, user_prompt, chatbot_response)
 
     # 4. Kembalikan jawaban
-    return Response({"response": chatbot_response})
+    return Response(chat_reply(chatbot_response, session))
 
 
-# === Regular Django Views (Sekarang Aman) ===
+SESSION_NOT_FOUND = "Sesi percakapan tidak ditemukan."
+
+
+def chatbot_busy_reply(error):
+    """Body respons 429 saat llm_limiter menolak request (header Retry-After diisi oleh view)."""
+    return {"error": f"Asisten AI sedang sibuk. Silakan coba lagi dalam {error.retry_after} detik."}
+
 
-def handle_uploaded_excel(file, company): # <-- 8. Tambahkan 'company' sebagai parameter
-    """Fungsi helper yang sekarang company-aware."""
+def get_chat_session(company, session_id):
+    """
+    Mengambil ChatSession milik perusahaan dari `session_id` di body request.
+    Mengembalikan None jika tidak diisi; melempar ChatSession.DoesNotExist jika
+    tidak valid atau milik perusahaan lain.
+    """
+    if session_id in (None, ''):
+        return None
     try:
-        df = pd.read_excel(file)
-        if 'Nama Produk' not in df.columns or 'Harga' not in df.columns:
-            raise ValueError("File Excel harus memiliki kolom 'Nama Produk' dan 'Harga'")
-
-        for index, row in df.iterrows():
-            # 9. Gunakan 'company' yang diterima untuk membuat produk
-            Product.objects.create(
-                company=company,
-                name=row['Nama Produk'],
-                price=row['Harga']
-            )
-        return {"status": "success", "message": f"{len(df)} produk berhasil diimpor."}
-    except Exception as e:
-        return {"status": "error", "message": f"Terjadi error: {e}"}
+        return ChatSession.objects.get(pk=int(session_id), company=company)
+    except (TypeError, ValueError):
+        raise ChatSession.DoesNotExist
+
+
+def save_chat_turn(company, session, prompt, response):
+    """
+    Menyimpan satu giliran chat; sesi ikut ditandai aktif dan diberi judul dari prompt pertama.
+    Dengan CHAT_HISTORY_WRITE_BEHIND, giliran hanya dicatat ke spool dan ditulis ke
+    database per batch oleh ChatHistoryWriter (lihat chat_writer.py).
+    """
+    if settings.CHAT_HISTORY_WRITE_BEHIND:
+        get_chat_writer().enqueue(company.id, session.id if session is not None else None, prompt, response)
+        return
+    ChatHistory.objects.create(company=company, session=session, prompt=prompt, response=response)
+    if session is not None:
+        session.title = session.title or prompt[:80]
+        session.save(update_fields=['title', 'updated_at'])
+
+
+def chat_reply(chatbot_response, session):
+    reply = {"response": chatbot_response}
+    if session is not None:
+        reply["session_id"] = session.id
+    return reply
+
+
+def authenticate_jwt(request):
+    """
+    Autentikasi JWT (header Authorization: Bearer) untuk view Django biasa
+    di luar DRF. Mengembalikan perusahaan milik user, atau None jika tidak valid.
+    """
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    if result is None:
+        return None
+    user = result[0]
+    try:
+        return user.company
+    except ObjectDoesNotExist:
+        return None
+
+
+def parse_chat_request(request):
+    """
+    Mengambil (prompt, session_id) dari body JSON {"prompt": ..., "session_id": ...}
+    atau body teks biasa (hanya prompt).
+    """
+    try:
+        data = json.loads(request.body or b'""')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return "", None
+    session_id = None
+    if isinstance(data, dict):
+        session_id = data.get('session_id')
+        data = data.get('prompt', '')
+    return (data.strip() if isinstance(data, str) else ""), session_id
+
+
+@csrf_exempt
+async def chatbot_async_api(request):
+    """
+    Versi async dari chatbot_api untuk dijalankan di server ASGI (uvicorn).
+    Selama menunggu jawaban Gemini, worker tetap bisa melayani request lain.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Metode tidak diizinkan untuk endpoint ini.'}, status=405)
+
+    user_company = await sync_to_async(authenticate_jwt)(request)
+    if user_company is None:
+        return JsonResponse({'detail': 'Kredensial autentikasi tidak valid atau tidak diberikan.'}, status=401)
+
+    user_prompt, session_id = parse_chat_request(request)
+    if not user_prompt:
+        return JsonResponse({"error": "Prompt tidak boleh kosong."}, status=400)
+    try:
+        session = await sync_to_async(get_chat_session)(user_company, session_id)
+    except ChatSession.DoesNotExist:
+        return JsonResponse({"error": SESSION_NOT_FOUND}, status=404)
+
+    try:
+        chatbot_response = await run_chatbot_conversation_async(user_prompt=user_prompt, company=user_company, session=session)
+    except ChatbotOverloaded as e:
+        return JsonResponse(chatbot_busy_reply(e), status=429, headers={'Retry-After': str(e.retry_after)})
+
+    await sync_to_async(save_chat_turn)(user_company, session, user_prompt, chatbot_response)
+    return JsonResponse(chat_reply(chatbot_response, session))
+
+
+def sse_event(data, event=None):
+    """Memformat satu event Server-Sent Events dengan payload JSON."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
+
+@csrf_exempt
+async def chatbot_stream_api(request):
+    """
+    Versi streaming dari chatbot_api (Server-Sent Events). Setiap potongan jawaban
+    dikirim sebagai event `data: {"text": ...}` begitu diterima dari Gemini, lalu
+    ditutup dengan `event: done` berisi jawaban lengkap setelah ChatHistory disimpan.
+    Jika klien berhenti membaca lebih awal, jawaban yang sudah terkirim tetap disimpan.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Metode tidak diizinkan untuk endpoint ini.'}, status=405)
 
+    user_company = await sync_to_async(authenticate_jwt)(request)
+    if user_company is None:
+        return JsonResponse({'detail': 'Kredensial autentikasi tidak valid atau tidak diberikan.'}, status=401)
+
+    user_prompt, session_id = parse_chat_request(request)
+    if not user_prompt:
+        return JsonResponse({"error": "Prompt tidak boleh kosong."}, status=400)
+    try:
+        session = await sync_to_async(get_chat_session)(user_company, session_id)
+    except ChatSession.DoesNotExist:
+        return JsonResponse({"error": SESSION_NOT_FOUND}, status=404)
+
+    # Potongan pertama diambil sebelum respons dibuat agar penolakan limiter masih bisa dibalas 429
+    stream = stream_chatbot_conversation(user_prompt=user_prompt, company=user_company, session=session)
+    try:
+        first_text = await anext(stream)
+    except ChatbotOverloaded as e:
+        return JsonResponse(chatbot_busy_reply(e), status=429, headers={'Retry-After': str(e.retry_after)})
+    except StopAsyncIteration:
+        first_text = None
+
+    async def event_stream():
+        chunks = []
+        try:
+            if first_text is not None:
+                chunks.append(first_text)
+                yield sse_event({'text': first_text})
+                async for text in stream:
+                    chunks.append(text)
+                    yield sse_event({'text': text})
+        finally:
+            # Tetap dijalankan saat klien memutus koneksi di tengah jawaban (generator
+            # di-cancel atau ditutup): slot limiter dilepas dan jawaban parsial tetap
+            # disimpan. shield() menjaga penyimpanan selesai meski task-nya dibatalkan.
+            await stream.aclose()
+            chatbot_response = "".join(chunks)
+            await asyncio.shield(sync_to_async(save_chat_turn)(user_company, session, user_prompt, chatbot_response))
+        yield sse_event(chat_reply(chatbot_response, session), event='done')
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Matikan buffering di reverse proxy (nginx) agar event langsung sampai ke client
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# === Regular Django Views (Sekarang Aman) ===
 
 @login_required # <-- 10. Terapkan decorator: view ini hanya bisa diakses user yang login
 def upload_products_view(request):
@@ -147,23 +406,39 @@ def upload_products_view(request):
     if request.method == 'POST':
         form = UploadFileForm(request.POST, request.FILES)
         if form.is_valid():
-            # 11. Kirim perusahaan user ke fungsi helper
-            result = handle_uploaded_excel(request.FILES['file'], request.user.company)
-            if result['status'] == 'success':
-                messages.success(request, result['message'])
-            else:
-                messages.error(request, result['message'])
+            # 11. Simpan file sebagai job; import dijalankan oleh worker `run_import_worker`
+            job = enqueue_import(request.FILES['file'], request.user.company)
+            messages.success(
+                request,
+                f"File diterima dan sedang diproses (ID job: {job.id}). "
+                f"Pantau progres di {reverse('import-job-detail-api', kwargs={'pk': job.id})}",
+            )
             return redirect('upload-products')
     else:
         form = UploadFileForm()
     
     return render(request, 'dashboard/upload_page.html', {'form': form})
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def import_job_detail_api(request, pk):
+    """
+    API untuk memantau progres satu job import produk MILIK PERUSAHAAN user.
+    """
+    try:
+        job = ImportJob.objects.defer('payload').get(id=pk, company=request.user.company)
+    except ImportJob.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    serializer = ImportJobSerializer(job)
+    return Response(serializer.data)
+
 # ================================================
 # === CUKUP SALIN DAN TEMPEL BLOK DI BAWAH INI ===
 # ================================================
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
 def chat_history_api(request):
     """
     API untuk mengambil daftar riwayat percakapan chatbot
@@ -172,14 +447,89 @@ def chat_history_api(request):
     # 1. Ambil perusahaan dari user yang sedang login
     user_company = request.user.company
 
-    # 2. Filter riwayat chat berdasarkan perusahaan
-    history = ChatHistory.objects.filter(company=user_company)
+    # 2. Filter riwayat chat berdasarkan perusahaan, per halaman (cursor) dari yang terbaru
+    fields = ChatHistorySerializer.Meta.fields
+    history = ChatHistory.objects.filter(company=user_company).values(*fields)
+    try:
+        page, next_url = paginate_keyset(history, request, '-created_at')
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    # 3. Ubah data menjadi JSON menggunakan serializer
-    serializer = ChatHistorySerializer(history, many=True)
+    # 3. Ubah data menjadi JSON lewat jalur baca cepat (format sama dengan ChatHistorySerializer)
+    data = ValuesRowSerializer(ChatHistorySerializer, fields).serialize(page)
 
     # 4. Kembalikan data
-    return Response(serializer.data)
+    return Response(data, headers=next_page_headers(next_url))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_api(request, dataset, file_format):
+    """
+    API untuk mengunduh seluruh data MILIK PERUSAHAAN user (products, sales,
+    chat-history) sebagai CSV atau XLSX, misalnya /exports/products.csv.
+    Respons dialirkan per potongan sehingga memori server tetap kecil berapa
+    pun jumlah barisnya.
+    """
+    if dataset not in EXPORT_DATASETS or file_format not in EXPORT_FORMATS:
+        return Response(
+            {"error": f"Ekspor tersedia untuk {', '.join(EXPORT_DATASETS)} dalam format {', '.join(EXPORT_FORMATS)}."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    user_company = request.user.company
+    print(f"LOG: Ekspor {dataset}.{file_format} untuk {user_company.name}")
+    iter_content, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(iter_content(EXPORT_DATASETS[dataset], user_company), content_type=content_type)
+    filename = f"{dataset}-{timezone.localdate().isoformat()}.{file_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
+def chat_session_list_api(request):
+    """
+    API untuk daftar sesi percakapan milik perusahaan (terakhir aktif lebih dulu,
+    pagination cursor) atau membuat sesi baru.
+    """
+    user_company = request.user.company
+
+    if request.method == 'GET':
+        fields = ChatSessionSerializer.Meta.fields
+        sessions = ChatSession.objects.filter(company=user_company).values(*fields)
+        try:
+            page, next_url = paginate_keyset(sessions, request, '-updated_at')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = ValuesRowSerializer(ChatSessionSerializer, fields).serialize(page)
+        return Response(data, headers=next_page_headers(next_url))
+
+    serializer = ChatSessionSerializer(data=request.data)
+    if serializer.is_valid():
+        serializer.save(company=user_company, user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
+def chat_session_messages_api(request, pk):
+    """
+    API untuk pesan-pesan dalam satu sesi percakapan MILIK PERUSAHAAN user,
+    dari yang terbaru, dengan pagination cursor.
+    """
+    if not ChatSession.objects.filter(id=pk, company=request.user.company).exists():
+        return Response({"error": SESSION_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
+
+    fields = ChatHistorySerializer.Meta.fields
+    session_messages = ChatHistory.objects.filter(session_id=pk).values(*fields)
+    try:
+        page, next_url = paginate_keyset(session_messages, request, '-created_at')
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    data = ValuesRowSerializer(ChatHistorySerializer, fields).serialize(page)
+    return Response(data, headers=next_page_headers(next_url))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -227,3 +577,50 @@ def proactive_suggestion_api(request):
         'suggestion': suggestion,
         'generated_at': timezone.now()
     })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_analytics_api(request):
+    """
+    API analitik penjualan untuk perusahaan yang sedang login: penjualan harian
+    beserta rolling average 7/28 hari dan z-score, pola per hari, perkiraan 7 hari
+    ke depan, dan daftar anomali. Rentang riwayat diatur dengan ?days= (default 90,
+    maksimal 365).
+    """
+    try:
+        days = int(request.query_params.get('days', 90))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= ANALYTICS_MAX_DAYS:
+        return Response(
+            {"error": f"Parameter days harus bilangan bulat antara 1 dan {ANALYTICS_MAX_DAYS}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return Response({
+        **build_sales_report(load_sales_history(request.user.company, days)),
+        'generated_at': timezone.now(),
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, NDJSONParser])
+def sales_bulk_api(request):
+    """
+    API untuk mencatat banyak penjualan sekaligus dari mesin kasir (POS).
+    Body berupa array JSON (Content-Type: application/json) atau satu objek
+    per baris (Content-Type: application/x-ndjson) dengan field transaction_id,
+    product_id, quantity, serta sale_date dan unit_price opsional.
+
+    Item dengan transaction_id yang sudah tercatat dilewati, jadi request yang
+    sama aman dikirim ulang. Item yang tidak valid dilaporkan tanpa menggagalkan
+    item lain.
+    """
+    items = request.data
+    if not (isinstance(items, list) or request.content_type.startswith(NDJSONParser.media_type)):
+        return Response(
+            {"error": "Body harus berupa array JSON atau NDJSON (satu penjualan per baris)."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    report = ingest_sales(request.user.company, items)
+    return Response(report.as_dict())
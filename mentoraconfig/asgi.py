@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Jalankan di produksi dengan uvicorn agar endpoint async (dashboard/chatbot/async/)
+bisa melayani banyak percakapan sekaligus per worker:
+
+    uvicorn mentoraconfig.asgi:application --host 0.0.0.0 --port $PORT --workers 2
 """
 
 import os
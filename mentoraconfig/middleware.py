@@ -0,0 +1,37 @@
+# mentoraconfig/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware yang juga async-capable.
+
+    WhiteNoise 6 hanya mendukung middleware sync. Di bawah ASGI, satu middleware
+    sync membuat Django menjalankan seluruh rantai (termasuk view async) lewat
+    thread sync_to_async yang sama, sehingga request chatbot async diproses satu
+    per satu. Di sini pencarian file statis tetap sync (cepat, di memori) dan
+    hanya penyajian file yang dipindah ke thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -58,7 +58,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
         'corsheaders.middleware.CorsMiddleware', 
     # Tambahkan middleware WhiteNoise di posisi kedua
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'mentoraconfig.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +96,87 @@ DATABASES = {
     )
 }
 
+# ==============================================================================
+# CACHE
+# ==============================================================================
+
+# Pakai Redis jika REDIS_URL tersedia (dibagi antar worker), jika tidak pakai
+# cache memori lokal per proses (cukup untuk development).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mentora-default',
+        }
+    }
+
+# Batas umur (detik) hasil analitik per perusahaan di cache, sebagai pengaman
+# tambahan selain invalidasi otomatis saat data Product/Sale berubah.
+TENANT_CACHE_TTL = int(os.environ.get('TENANT_CACHE_TTL', 300))
+
+# Invalidasi cache per perusahaan bergantung pada versi data yang disimpan di
+# cache (dashboard/cache.py). Dengan LocMemCache versi itu milik satu proses:
+# perubahan data di satu worker gunicorn tidak membatalkan cache worker lain,
+# yang akan terus menyajikan hasil lama sampai TENANT_CACHE_TTL habis. Karena
+# itu cache analitik (tenant_cached) dan prompt cache chatbot hanya aktif jika
+# cache dibagi antar worker (REDIS_URL) atau saat DEBUG (satu proses runserver).
+TENANT_CACHE_ENABLED = bool(REDIS_URL) or DEBUG
+
+# Cache jawaban chatbot per proses worker: jumlah entri maksimum (LRU)
+CHATBOT_PROMPT_CACHE_SIZE = int(os.environ.get('CHATBOT_PROMPT_CACHE_SIZE', 2000))
+
+# Budget token (estimasi) untuk konteks yang dikirim ke Gemini per request:
+# prompt + ringkasan percakapan lama + giliran terbaru.
+CHATBOT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHATBOT_CONTEXT_TOKEN_BUDGET', 2000))
+
+# Limiter panggilan Gemini per proses worker: token bucket per perusahaan
+# (permintaan per menit + burst) dan batas panggilan bersamaan untuk semua
+# perusahaan. Jika penuh, request menunggu di antrean (maksimal CHATBOT_MAX_QUEUE
+# request, CHATBOT_QUEUE_TIMEOUT detik) sebelum ditolak dengan HTTP 429.
+CHATBOT_RATE_PER_MINUTE = float(os.environ.get('CHATBOT_RATE_PER_MINUTE', 20))
+CHATBOT_RATE_BURST = int(os.environ.get('CHATBOT_RATE_BURST', 5))
+CHATBOT_MAX_CONCURRENT_CALLS = int(os.environ.get('CHATBOT_MAX_CONCURRENT_CALLS', 8))
+CHATBOT_MAX_QUEUE = int(os.environ.get('CHATBOT_MAX_QUEUE', 16))
+CHATBOT_QUEUE_TIMEOUT = float(os.environ.get('CHATBOT_QUEUE_TIMEOUT', 5.0))
+
+# Ketahanan panggilan Gemini: deadline per panggilan (detik), retry dengan
+# exponential backoff + jitter untuk error sementara, dan circuit breaker yang
+# terbuka setelah CHATBOT_BREAKER_FAILURES kegagalan berturut-turut. Selama
+# circuit terbuka, chatbot menjawab dari data toko tanpa memanggil Gemini.
+CHATBOT_LLM_TIMEOUT = float(os.environ.get('CHATBOT_LLM_TIMEOUT', 20.0))
+CHATBOT_LLM_RETRIES = int(os.environ.get('CHATBOT_LLM_RETRIES', 2))
+CHATBOT_LLM_RETRY_BASE_DELAY = float(os.environ.get('CHATBOT_LLM_RETRY_BASE_DELAY', 0.5))
+CHATBOT_LLM_RETRY_MAX_DELAY = float(os.environ.get('CHATBOT_LLM_RETRY_MAX_DELAY', 4.0))
+CHATBOT_BREAKER_FAILURES = int(os.environ.get('CHATBOT_BREAKER_FAILURES', 5))
+CHATBOT_BREAKER_RESET_TIMEOUT = float(os.environ.get('CHATBOT_BREAKER_RESET_TIMEOUT', 30.0))
+
+# Riwayat chat ditulis write-behind: dicatat ke file spool lokal lalu di-flush ke
+# database per batch (saat CHAT_WRITE_BATCH_SIZE pesan terkumpul atau setiap
+# CHAT_WRITE_FLUSH_INTERVAL detik). Spool yang tertinggal dari worker yang mati
+# ditulis ulang saat worker berikutnya mulai atau lewat `manage.py replay_chat_spool`.
+CHAT_HISTORY_WRITE_BEHIND = os.environ.get('CHAT_HISTORY_WRITE_BEHIND', 'True').lower() in ('true', '1')
+CHAT_WRITE_BATCH_SIZE = int(os.environ.get('CHAT_WRITE_BATCH_SIZE', 50))
+CHAT_WRITE_FLUSH_INTERVAL = float(os.environ.get('CHAT_WRITE_FLUSH_INTERVAL', 1.0))
+# Batch yang gagal sebanyak ini berturut-turut dilepas dari memori (tetap ada di spool untuk replay)
+CHAT_WRITE_MAX_ATTEMPTS = int(os.environ.get('CHAT_WRITE_MAX_ATTEMPTS', 5))
+CHAT_SPOOL_DIR = Path(os.environ.get('CHAT_SPOOL_DIR', BASE_DIR / 'var' / 'chat_spool'))
+
+# Endpoint penjualan massal (POS) memproses dan menyimpan item per batch
+# SALES_INGEST_BATCH_SIZE baris: satu transaksi dan satu bulk_create per batch.
+SALES_INGEST_BATCH_SIZE = int(os.environ.get('SALES_INGEST_BATCH_SIZE', 1000))
+
+# Batas jumlah operasi (create/update/delete) per request endpoint produk massal.
+PRODUCT_BULK_MAX_OPERATIONS = int(os.environ.get('PRODUCT_BULK_MAX_OPERATIONS', 10000))
+
 # ==============================================================================
 # PASSWORD & INTERNATIONALIZATION
 # ==============================================================================